@@ -2,6 +2,7 @@
 
 import psycopg2
 from psycopg2 import sql # For safe SQL query construction
+from psycopg2 import pool as pg_pool # Connection reuse across requests
 from psycopg2.extras import execute_values # For potential bulk inserts later (not used in current copy_expert)
 import pandas as pd
 import logging # Import logging
@@ -10,6 +11,16 @@ import io # For using StringIO with copy_expert
 # import traceback # No longer needed if using logger.error(exc_info=True)
 from typing import List, Dict, Tuple, Any, Optional
 import csv # For CSV handling in copy_expert
+import threading
+from urllib.parse import quote
+
+# Optional: connectorx reads whole tables straight into Arrow columns (Rust, parallel)
+try:
+    import connectorx as cx
+    CONNECTORX_AVAILABLE = True
+except ImportError:
+    cx = None # type: ignore
+    CONNECTORX_AVAILABLE = False
 
 # Import constants for DB config
 from constants import DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD, DB_DEFAULT_SCHEMA_NAME
@@ -22,6 +33,9 @@ class DatabaseAgent:
     Agent responsible for interacting with the PostgreSQL database.
     Manages connections, data loading, query execution, and schema retrieval.
     """
+    # Connections are pooled; a new one costs a TCP/auth handshake, and a request can make several calls
+    POOL_MIN_CONNECTIONS = 1
+    POOL_MAX_CONNECTIONS = 10
 
     def __init__(self):
         """Initializes the DatabaseAgent with connection parameters."""
@@ -32,6 +46,8 @@ class DatabaseAgent:
             "user": DB_USER,
             "password": DB_PASSWORD
         }
+        self._pool = None # Created on first successful connect, see get_connection
+        self._pool_lock = threading.Lock()
         self._test_connection() # Test connection on initialization
 
     def _test_connection(self):
@@ -48,12 +64,21 @@ class DatabaseAgent:
              # Error logged by get_connection
              pass # Avoid redundant logging
         finally:
-            if conn: conn.close()
+            if conn: self.release_connection(conn)
 
     def get_connection(self):
-        """Establishes and returns a new connection to the PostgreSQL database."""
+        """Returns a pooled connection to the PostgreSQL database; hand it back with release_connection."""
         try:
-            conn = psycopg2.connect(**self.db_config)
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = pg_pool.ThreadedConnectionPool(self.POOL_MIN_CONNECTIONS, self.POOL_MAX_CONNECTIONS, **self.db_config)
+                    logger.debug("PostgreSQL connection pool created.")
+            try:
+                conn = self._pool.getconn()
+            except pg_pool.PoolError:
+                # All pooled connections are in use; serve this call with a connection of its own
+                logger.warning("PostgreSQL connection pool exhausted, opening an unpooled connection.")
+                conn = psycopg2.connect(**self.db_config)
             logger.debug("PostgreSQL connection established.")
             return conn
         except psycopg2.OperationalError as e:
@@ -63,6 +88,17 @@ class DatabaseAgent:
             logger.error(f"PostgreSQL Connection Error: An unexpected error occurred. {e}", exc_info=True)
             return None
 
+    def release_connection(self, conn):
+        """Returns a connection from get_connection to the pool (open transactions are rolled back)."""
+        try:
+            # Connections broken mid-use are discarded instead of being handed out again
+            self._pool.putconn(conn, close=bool(conn.closed))
+        except (pg_pool.PoolError, AttributeError):
+            conn.close() # Unpooled connection
+        except Exception as e:
+            logger.warning(f"Could not return PostgreSQL connection to the pool: {e}")
+            conn.close()
+
     def _sanitize_name(self, name: str, is_table_name=False) -> str:
         """
         Sanitizes a name for PostgreSQL (lowercase, underscores, no leading numbers, max length).
@@ -223,7 +259,7 @@ class DatabaseAgent:
             logger.error(f"Unexpected error during table setup for '{fully_qualified_table_name}': {e}", exc_info=True)
             return None, None
         finally:
-            if conn: conn.close()
+            if conn: self.release_connection(conn)
 
     def execute_query(self, sql_query: str, params: Optional[tuple] = None) -> tuple[Optional[pd.DataFrame], Optional[str]]:
         """
@@ -258,7 +294,35 @@ class DatabaseAgent:
             logger.error(error_msg, exc_info=True)
             return None, str(e)
         finally:
-            if conn: conn.close()
+            if conn: self.release_connection(conn)
+
+    def copy_query_to_csv(self, sql_query: str, fileobj) -> Optional[str]:
+        """
+        Streams a SELECT query's result as CSV (with header) into a binary file object using
+        COPY ... TO STDOUT, without building a DataFrame.
+
+        Returns:
+            None on success, else the error message string.
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            if not conn: return "Failed to connect to database for CSV export."
+            # COPY takes the query in parentheses, where a trailing ';' is a syntax error
+            copy_sql = sql.SQL("COPY ({}) TO STDOUT WITH (FORMAT CSV, HEADER)").format(sql.SQL(sql_query.strip().rstrip(';')))
+            logger.debug(f"Exporting SQL result as CSV (PostgreSQL COPY): {sql_query[:500]}...")
+            with conn.cursor() as cur:
+                cur.copy_expert(copy_sql, fileobj)
+            return None
+        except psycopg2.Error as e:
+            error_detail = f"{e.pgcode} - {e.pgerror}" if hasattr(e, 'pgcode') and e.pgcode else str(e)
+            logger.warning(f"PostgreSQL COPY export failed: {error_detail} | Query: {sql_query[:500]}...")
+            return error_detail
+        except Exception as e:
+            logger.error(f"Unexpected error during CSV export: {e}", exc_info=True)
+            return str(e)
+        finally:
+            if conn: self.release_connection(conn)
 
     def get_table_schema_for_llm(self, table_name: str, schema_name: str = DB_DEFAULT_SCHEMA_NAME) -> str:
         """
@@ -308,7 +372,90 @@ class DatabaseAgent:
             logger.error(f"Unexpected error fetching schema for '{fully_qualified_table_name}': {e}", exc_info=True)
             return f"Error fetching schema: {str(e)}"
         finally:
-            if conn: conn.close()
+            if conn: self.release_connection(conn)
+
+    def get_table_schema_version(self, table_name_with_schema: str) -> Optional[str]:
+        """
+        Catalog-only fingerprint of a table's definition: its OID (new when the table is
+        recreated) and each column's name, type, NOT NULL flag and default. Changes with
+        every DDL from any client and, unlike get_table_version, never scans the table.
+        None if the table can't be looked up.
+        """
+        query = """
+            SELECT c.oid::text || '|' || coalesce(string_agg(
+                       a.attname || ':' || a.atttypid::text || ':' || a.atttypmod::text || ':' || a.attnotnull::text
+                       || ':' || coalesce(pg_get_expr(d.adbin, d.adrelid), ''), ',' ORDER BY a.attnum), '')
+            FROM pg_class c
+            LEFT JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+            LEFT JOIN pg_attrdef d ON d.adrelid = c.oid AND d.adnum = a.attnum
+            WHERE c.oid = to_regclass(%s)
+            GROUP BY c.oid;
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            if not conn: return None
+            with conn.cursor() as cur:
+                cur.execute(query, (table_name_with_schema,))
+                row = cur.fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            logger.warning(f"Could not read schema version for '{table_name_with_schema}': {e}")
+            return None
+        finally:
+            if conn: self.release_connection(conn)
+
+    def get_table_version(self, table_name_with_schema: str) -> Optional[list]:
+        """
+        Fingerprint of a table's contents and columns: its storage file node (changes on
+        rewrite/TRUNCATE), its column names and types, its row count and the newest row
+        version's transaction ID (xmin; every INSERT and UPDATE writes rows with a new one,
+        and a DELETE lowers the count), as a list (it is stored in the session).
+        Exact for writes from any client, unlike the asynchronously flushed pg_stat counters;
+        count(*) scans the table, which is still far cheaper than reading and profiling it.
+        None if the table can't be looked up.
+        """
+        catalog_query = """
+            SELECT c.relfilenode, n.nspname, c.relname,
+                   (SELECT string_agg(a.attname || ':' || a.atttypid::text, ',' ORDER BY a.attnum)
+                    FROM pg_attribute a WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped)
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE c.oid = to_regclass(%s);
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            if not conn: return None
+            with conn.cursor() as cur:
+                cur.execute(catalog_query, (table_name_with_schema,))
+                row = cur.fetchone()
+                if not row:
+                    return None
+                relfilenode, schema_name, table_name, columns = row
+                cur.execute(sql.SQL("SELECT count(*), max(xmin::text::bigint) FROM {}.{}").format(
+                    sql.Identifier(schema_name), sql.Identifier(table_name)))
+                row_count, max_xmin = cur.fetchone()
+            return [relfilenode, columns, row_count, max_xmin]
+        except Exception as e:
+            logger.warning(f"Could not read table version for '{table_name_with_schema}': {e}")
+            return None
+        finally:
+            if conn: self.release_connection(conn)
+
+    def _read_table_connectorx(self, table_name_with_schema: str) -> Optional[pd.DataFrame]:
+        """Reads a whole table via connectorx as Arrow columns; None on any error (caller falls back to pd.read_sql)."""
+        p = self.db_config
+        conn_str = (f"postgresql://{quote(str(p['user']), safe='')}:{quote(str(p['password']), safe='')}"
+                    f"@{p['host']}:{p['port']}/{quote(str(p['dbname']), safe='')}")
+        try:
+            table = cx.read_sql(conn_str, f"SELECT * FROM {table_name_with_schema}", return_type="arrow")
+            df = table.to_pandas(split_blocks=True, self_destruct=True)
+            logger.info(f"Fetched {len(df)} rows from table '{table_name_with_schema}' via connectorx.")
+            return df
+        except Exception as e:
+            logger.warning(f"connectorx read of '{table_name_with_schema}' failed, using pd.read_sql: {e}")
+            return None
 
     def get_dataframe_from_table(self, table_name_with_schema: str) -> Optional[pd.DataFrame]:
         """
@@ -318,6 +465,11 @@ class DatabaseAgent:
             logger.error("get_dataframe_from_table: No table name provided.")
             return None
 
+        if CONNECTORX_AVAILABLE: # Own connection, no pooled one needed
+            df = self._read_table_connectorx(table_name_with_schema)
+            if df is not None:
+                return df
+
         conn = None
         try:
             conn = self.get_connection()
@@ -337,4 +489,4 @@ class DatabaseAgent:
             return None
         finally:
             if conn:
-                conn.close()
\ No newline at end of file
+                self.release_connection(conn)
\ No newline at end of file
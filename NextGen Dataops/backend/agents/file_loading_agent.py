@@ -6,7 +6,19 @@ import os # Needed for os.path.exists if checking path type
 # import traceback # No longer needed with logger.error(exc_info=True)
 import logging # Import logging
 from pathlib import Path # For type hinting and checking path
-from typing import Union
+from typing import Optional, Union
+
+# Optional: pyarrow's multi-threaded CSV parser; pandas' parser is the fallback
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa = None # type: ignore
+    pc = None # type: ignore
+    pacsv = None # type: ignore
+    PYARROW_AVAILABLE = False
 
 # Get a logger specific to this module
 logger = logging.getLogger(__name__)
@@ -22,13 +34,59 @@ class FileLoadingAgent:
         logger.debug("FileLoadingAgent initialized.")
         pass # No specific state needed currently
 
-    def load_data(self, file_input: Union[str, Path, io.BytesIO, io.StringIO]) -> Union[pd.DataFrame, None]:
+    # Strings pd.read_csv treats as missing by default
+    CSV_NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                     '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+    CSV_BLOCK_SIZE = 4 * 1024 * 1024 # Bytes per parallel parse block
+
+    def _read_csv_arrow(self, file_input) -> Union[pd.DataFrame, None]:
+        """
+        Parses a UTF-8 CSV with pyarrow's multi-threaded reader, typed the way pd.read_csv
+        types it. Returns None when pandas has to do it instead (e.g. other encodings,
+        unnamed or duplicate headers, which pandas renames).
+        """
+        if isinstance(file_input, io.TextIOBase):
+            return None # pyarrow reads bytes only
+        read_options = pacsv.ReadOptions(use_threads=True, block_size=self.CSV_BLOCK_SIZE)
+        convert_options = pacsv.ConvertOptions(null_values=self.CSV_NA_VALUES, strings_can_be_null=True)
+        try:
+            table = pacsv.read_csv(file_input, read_options=read_options, convert_options=convert_options)
+            names = table.column_names
+            if '' in names or len(set(names)) != len(names):
+                return None
+            for field in table.schema:
+                if pa.types.is_binary(field.type):
+                    return None # Not valid UTF-8; pandas retries with latin1
+                if pa.types.is_floating(field.type):
+                    # Integers beyond int64 come back as (rounded) doubles; pandas keeps them exact
+                    largest = pc.max(pc.abs(table.column(field.name))).as_py()
+                    if largest is not None and largest >= 2**63:
+                        return None
+            # pandas doesn't infer dates: re-read those columns as text
+            temporal_columns = {field.name: pa.string() for field in table.schema if pa.types.is_temporal(field.type)}
+            if temporal_columns:
+                if hasattr(file_input, 'seek'):
+                    file_input.seek(0)
+                convert_options.column_types = temporal_columns
+                table = pacsv.read_csv(file_input, read_options=read_options, convert_options=convert_options)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            logger.debug(f"pyarrow CSV reader declined, using pandas: {e}")
+            return None
+        # All-empty columns come back as Arrow nulls; pandas makes them float NaN
+        for i, field in enumerate(table.schema):
+            if pa.types.is_null(field.type):
+                table = table.set_column(i, field.name, pa.nulls(table.num_rows, pa.float64()))
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+    def load_data(self, file_input: Union[str, Path, io.BytesIO, io.StringIO], file_name: Optional[str] = None) -> Union[pd.DataFrame, None]:
         """
         Loads data from a file path or buffer into a Pandas DataFrame.
 
         Args:
             file_input: A file path (string or Path object) or a file-like
-                        object (BytesIO, StringIO).
+                        object (BytesIO, StringIO, an upload's stream).
+            file_name: Original file name of a buffer, used for its extension
+                       when the buffer has no usable 'name' of its own.
 
         Returns:
             A pandas DataFrame if successful, None otherwise.
@@ -47,7 +105,8 @@ class FileLoadingAgent:
             logger.debug(f"Loading from path: {file_path}")
         elif hasattr(file_input, 'read') and hasattr(file_input, 'seek'): # Check if it's a file-like object
              # Try to get a name if available (e.g., from UploadedFile)
-             file_name_for_log = getattr(file_input, 'name', 'Uploaded Buffer')
+             file_name_for_log = file_name or getattr(file_input, 'name', None) or 'Uploaded Buffer'
+             file_name_for_log = str(file_name_for_log) # Temp file buffers may be named by descriptor
              # Infer extension from name if possible
              if '.' in file_name_for_log:
                  file_extension = file_name_for_log.rsplit('.', 1)[-1].lower()
@@ -71,24 +130,31 @@ class FileLoadingAgent:
             logger.info(f"Attempting to load '{file_name_for_log}' (extension: '{file_extension}')...")
 
             if file_extension == 'csv':
-                try:
-                    # Pass the path or buffer directly
-                    df = pd.read_csv(file_input)
-                    logger.debug(f"CSV '{file_name_for_log}' loaded successfully with default UTF-8.")
-                except UnicodeDecodeError:
-                    logger.warning(f"UTF-8 decoding failed for '{file_name_for_log}', trying 'latin1' encoding...")
-                    # If it's a buffer, we need seek(0) before retrying
-                    if hasattr(file_input, 'seek'):
-                        file_input.seek(0)
+                if PYARROW_AVAILABLE:
+                    df = self._read_csv_arrow(file_input)
+                    if df is not None:
+                        logger.debug(f"CSV '{file_name_for_log}' loaded with the pyarrow reader.")
+                    elif hasattr(file_input, 'seek'):
+                        file_input.seek(0) # pandas re-reads the buffer from the start
+                if df is None:
                     try:
-                        df = pd.read_csv(file_input, encoding='latin1')
-                        logger.debug(f"CSV '{file_name_for_log}' loaded successfully with 'latin1'.")
-                    except Exception as e_latin1:
-                         logger.error(f"Failed reading CSV '{file_name_for_log}' with latin1. Error: {e_latin1}", exc_info=True)
-                         return None
-                except Exception as e_csv:
-                    logger.error(f"Failed to parse CSV '{file_name_for_log}'. Error: {e_csv}", exc_info=True)
-                    return None
+                        # Pass the path or buffer directly
+                        df = pd.read_csv(file_input)
+                        logger.debug(f"CSV '{file_name_for_log}' loaded successfully with default UTF-8.")
+                    except UnicodeDecodeError:
+                        logger.warning(f"UTF-8 decoding failed for '{file_name_for_log}', trying 'latin1' encoding...")
+                        # If it's a buffer, we need seek(0) before retrying
+                        if hasattr(file_input, 'seek'):
+                            file_input.seek(0)
+                        try:
+                            df = pd.read_csv(file_input, encoding='latin1')
+                            logger.debug(f"CSV '{file_name_for_log}' loaded successfully with 'latin1'.")
+                        except Exception as e_latin1:
+                             logger.error(f"Failed reading CSV '{file_name_for_log}' with latin1. Error: {e_latin1}", exc_info=True)
+                             return None
+                    except Exception as e_csv:
+                        logger.error(f"Failed to parse CSV '{file_name_for_log}'. Error: {e_csv}", exc_info=True)
+                        return None
 
             elif file_extension in ['xlsx', 'xls']:
                 try:
@@ -10,6 +10,7 @@ API calls, and error handling for these two providers using only the openai libr
 
 # import traceback # No longer needed with logger.error(exc_info=True)
 import logging # Import logging
+from functools import lru_cache
 from typing import List, Dict, Tuple, Any, Optional
 
 # --- SDK Import ---
@@ -36,6 +37,25 @@ logger = logging.getLogger(__name__)
 # Default Nvidia API base URL
 NVIDIA_BASE_URL = "https://integrate.api.nvidia.com/v1"
 
+# --- Client Cache ---
+# One client per credential set, reused across calls and requests: each client owns an HTTP
+# connection pool, so later calls skip the TCP/TLS handshake. OpenAI clients are thread-safe.
+@lru_cache(maxsize=8)
+def _get_azure_client(api_key: str, azure_endpoint: str, api_version: str):
+    return AzureOpenAI(
+        api_key=api_key,
+        azure_endpoint=azure_endpoint, # Use azure_endpoint for base_url
+        api_version=api_version,
+        # Azure credentials type is implicitly handled by passing these specific args
+    )
+
+@lru_cache(maxsize=8)
+def _get_openai_client(api_key: str, base_url: str):
+    return OpenAI(
+        api_key=api_key,
+        base_url=base_url
+    )
+
 # --- Main Client Function ---
 def execute_llm_completion(
     llm_config: Dict[str, Any],
@@ -95,13 +115,8 @@ def execute_llm_completion(
                 logger.error("Azure API Key, API Base URL (Endpoint), or API Version is missing in credentials.")
                 return None, "Azure API Key, API Base URL (Endpoint), or API Version is missing in credentials."
 
-            # Configure the OpenAI client FOR Azure
-            client = AzureOpenAI(
-                api_key=api_key,
-                azure_endpoint=azure_endpoint, # Use azure_endpoint for base_url
-                api_version=api_version,
-                # Azure credentials type is implicitly handled by passing these specific args
-            )
+            # Configure the OpenAI client FOR Azure (cached per credential set)
+            client = _get_azure_client(api_key, azure_endpoint, api_version)
             # Model for Azure is the DEPLOYMENT NAME (remove potential 'azure/' prefix)
             model_to_use = model_name.split('/')[-1] if '/' in model_name else model_name
             logger.info(f"Configured OpenAI client for Azure. Endpoint: {azure_endpoint}, Version: {api_version}, Deployment: {model_to_use}")
@@ -117,11 +132,8 @@ def execute_llm_completion(
                 logger.error("Nvidia API Key is missing in credentials.")
                 return None, "Nvidia API Key is missing in credentials."
 
-            # Configure the OpenAI client FOR Nvidia
-            client = OpenAI(
-                api_key=api_key,
-                base_url=base_url
-            )
+            # Configure the OpenAI client FOR Nvidia (cached per credential set)
+            client = _get_openai_client(api_key, base_url)
             # Model for Nvidia is the full model identifier string
             model_to_use = model_name
             logger.info(f"Configured OpenAI client for Nvidia. Base URL: {base_url}, Model: {model_to_use}")
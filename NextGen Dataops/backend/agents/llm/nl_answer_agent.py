@@ -3,6 +3,7 @@
 # import streamlit as st # Removed - For debug only
 # import traceback # Removed - No longer needed
 import logging
+import os
 import pandas as pd
 from typing import List, Dict, Tuple, Optional, Any
 import math # For token estimation
@@ -20,6 +21,11 @@ logger = logging.getLogger(__name__)
 # Simple heuristic: characters per token (adjust based on model/language)
 CHARS_PER_TOKEN_ESTIMATE = 4
 
+# Answer tiny results (1x1, one short row) from a template instead of an LLM round-trip;
+# empty results still go to the LLM, which phrases them for the question asked
+TEMPLATE_ANSWERS_ENABLED = os.environ.get("NL_TEMPLATE_ANSWERS", "true").lower() in ("1", "true", "yes")
+TEMPLATE_MAX_COLUMNS = 3
+
 class NLAnswerAgent:
     """
     Agent that uses an LLM to generate a user-friendly rephrasing of
@@ -75,6 +81,23 @@ class NLAnswerAgent:
         logger.debug(f"Formatted data string (truncated={is_truncated}): {data_str[:200]}...") # Log snippet
         return data_str, is_truncated
 
+    def template_answer(self, data_results: Any) -> Optional[str]:
+        """
+        Deterministic answer for trivially small results (e.g. SELECT COUNT(*)), so no LLM call is needed.
+        Returns None when the result should go to the LLM instead, including for empty results.
+        """
+        if not TEMPLATE_ANSWERS_ENABLED or not isinstance(data_results, pd.DataFrame):
+            return None
+        n_rows, n_cols = data_results.shape
+        if n_rows != 1 or not 1 <= n_cols <= TEMPLATE_MAX_COLUMNS:
+            return None
+        # Read cell by cell so a mixed-type row isn't upcast (iloc[0] would turn ints into floats)
+        values = ['NULL' if pd.isna(v) else str(v) for v in (data_results.iat[0, i] for i in range(n_cols))]
+        if n_cols == 1:
+            return f"The {data_results.columns[0]} is {values[0]}."
+        parts = [f"{col}: {val}" for col, val in zip(data_results.columns, values)]
+        return "The result is " + ", ".join(parts) + "."
+
     def _construct_prompt(self, original_question: str, data_results_str: str, is_truncated: bool) -> List[Dict[str, str]]:
         """ Constructs prompt for LLM to simply rephrase the provided data. """
         system_prompt = """You are a helpful data assistant. Rephrase the provided data results concisely and clearly in natural language to answer the user's original question.
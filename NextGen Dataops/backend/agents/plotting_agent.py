@@ -18,6 +18,19 @@ import logging # Import logging
 # Get a logger specific to this module
 logger = logging.getLogger(__name__)
 
+_worker_plotter = None # PlottingAgent of a plot worker process, see render_plot_in_worker
+
+def render_plot_in_worker(params: dict, df: pd.DataFrame) -> tuple[bytes | None, str | None]:
+    """
+    Runs PlottingAgent.generate_plot inside a worker process, which has its own pyplot state.
+    Returns (png_bytes, error_message); the figure itself is closed and not sent back.
+    """
+    global _worker_plotter
+    if _worker_plotter is None:
+        _worker_plotter = PlottingAgent()
+    _fig, png_bytes, error = _worker_plotter.generate_plot(params, df)
+    return png_bytes, error
+
 class PlottingAgent:
     """
     Agent responsible for creating plots using Seaborn/Matplotlib
@@ -10,9 +10,22 @@ a structured profiling report.
 import pandas as pd
 import numpy as np
 import logging # Import logging
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 # import traceback # No longer needed with logger.error(exc_info=True)
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import DBSCAN
+from scipy import stats
+
+# --- Optional Arrow acceleration ---
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa = None # type: ignore
+    pc = None # type: ignore
+    PYARROW_AVAILABLE = False
 
 # (Optional) Import data models if defining a strict report structure
 # from core.data_models import ProfilingReport  # Example if using Pydantic
@@ -25,6 +38,8 @@ class PreprocessingAgent:
     Agent responsible for profiling the DataFrame and detecting outliers.
     Does not modify the original DataFrame.
     """
+    # Above this many rows, deep memory usage of object columns is estimated from a sample
+    MEMORY_SAMPLE_ROWS = 10000
 
     def __init__(self):
         """Initializes the PreprocessingAgent."""
@@ -67,7 +82,7 @@ class PreprocessingAgent:
             profile_report['basic_info'] = {
                 "rows": len(df),
                 "columns": len(df.columns),
-                "duplicates": int(df.duplicated().sum()), # Ensure standard int type
+                "duplicates": self._count_duplicates(df),
                 # Get memory usage string (more informative than just bytes)
                 "memory_usage": self._get_memory_usage(df)
             }
@@ -75,36 +90,50 @@ class PreprocessingAgent:
             # 2. Data Types
             logger.debug("Identifying data types...")
             # Convert dtypes to string representation for JSON compatibility if needed later
-            profile_report['data_types'] = {col: str(dtype) for col, dtype in df.dtypes.items()}
+            profile_report['data_types'] = df.dtypes.astype(str).to_dict()
 
             # 3. Missing Values
             logger.debug("Calculating missing values...")
-            missing_counts = df.isnull().sum()
-            missing_percentages = (missing_counts / len(df)) * 100 if len(df) > 0 else missing_counts * 0
+            # Single pass over the null mask; percentages computed on the raw NumPy array
+            missing_counts = df.isna().sum().to_numpy()
+            missing_percentages = np.round(missing_counts * (100.0 / max(len(df), 1)), 2)
             profile_report['missing_values'] = {
-                col: {"count": int(count), "percentage": round(percentage, 2)}
-                for col, count, percentage in zip(missing_counts.index, missing_counts.values, missing_percentages.values)
+                col: {"count": int(count), "percentage": float(percentage)}
+                for col, count, percentage in zip(df.columns.to_numpy(), missing_counts, missing_percentages)
             }
 
+            # Select column subsets once; reused by every section below
+            numeric_df = df.select_dtypes(include=np.number)
+            object_cols = df.select_dtypes(include=['object', 'string', 'category']).columns
+
             # 4. Descriptive Statistics
             logger.debug("Calculating descriptive statistics...")
-            numeric_stats = None
-            categorical_stats = None
-            try:
-                # Describe numeric columns
-                numeric_cols = df.select_dtypes(include=np.number).columns
-                if not numeric_cols.empty:
-                    numeric_stats = df[numeric_cols].describe().round(3).to_dict() # Convert to dict
-            except Exception as e:
-                 logger.warning(f"Could not calculate numeric descriptive stats: {e}")
 
-            try:
-                # Describe categorical/object columns
-                object_cols = df.select_dtypes(include=['object', 'string', 'category']).columns
-                if not object_cols.empty:
-                    categorical_stats = df[object_cols].describe().to_dict() # Convert to dict
-            except Exception as e:
-                 logger.warning(f"Could not calculate categorical descriptive stats: {e}")
+            def describe_numeric():
+                try:
+                    # Describe numeric columns
+                    if not numeric_df.columns.empty:
+                        return numeric_df.describe().round(3).to_dict() # Convert to dict
+                except Exception as e:
+                    logger.warning(f"Could not calculate numeric descriptive stats: {e}")
+                return None
+
+            def describe_categorical():
+                try:
+                    # Describe categorical/object columns
+                    if not object_cols.empty:
+                        return self._describe_categorical(df[object_cols]).to_dict() # Convert to dict
+                except Exception as e:
+                    logger.warning(f"Could not calculate categorical descriptive stats: {e}")
+                return None
+
+            # Both describes spend most of their time in GIL-releasing C routines,
+            # so running them side by side overlaps the work on mixed-schema frames.
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                numeric_future = executor.submit(describe_numeric)
+                categorical_future = executor.submit(describe_categorical)
+                numeric_stats = numeric_future.result()
+                categorical_stats = categorical_future.result()
 
             profile_report['descriptive_stats'] = {
                 "numeric": numeric_stats,
@@ -114,21 +143,20 @@ class PreprocessingAgent:
             # 5. Cardinality (Unique Values)
             logger.debug("Calculating cardinality...")
             try:
-                profile_report['cardinality'] = df.nunique().astype(int).to_dict() # Convert to dict of ints
+                profile_report['cardinality'] = self._cardinality(df)
             except Exception as e:
                  logger.warning(f"Could not calculate cardinality: {e}")
                  profile_report['cardinality'] = {}
 
 
             # --- Numerical Analysis ---
-            numeric_df = df.select_dtypes(include=np.number)
             if not numeric_df.empty:
                 # 6. Correlation Matrix
                 logger.debug("Calculating correlation matrix...")
                 try:
                     # Only calculate if more than 1 numeric column
                     if len(numeric_df.columns) > 1:
-                        profile_report['correlation_matrix'] = numeric_df.corr().round(3).to_dict()
+                        profile_report['correlation_matrix'] = self._correlation_matrix(numeric_df).round(3).to_dict()
                     else:
                          profile_report['correlation_matrix'] = None # Not applicable
                          logger.debug("Skipping correlation: <= 1 numeric column.")
@@ -136,25 +164,21 @@ class PreprocessingAgent:
                     logger.warning(f"Could not calculate correlation matrix: {e}")
                     profile_report['correlation_matrix'] = None
 
-                # 7. Skewness
-                logger.debug("Calculating skewness...")
+                # 7. & 8. Skewness and Kurtosis (shared moment pass)
+                logger.debug("Calculating skewness and kurtosis...")
+                scaled = None # Standardized matrix shared with DBSCAN when available
                 try:
-                    profile_report['skewness'] = numeric_df.skew().round(3).to_dict()
+                    skewness, kurtosis, scaled = self._skew_kurtosis(numeric_df)
+                    profile_report['skewness'] = skewness.round(3).to_dict()
+                    profile_report['kurtosis'] = kurtosis.round(3).to_dict()
                 except Exception as e:
-                    logger.warning(f"Could not calculate skewness: {e}")
+                    logger.warning(f"Could not calculate skewness/kurtosis: {e}")
                     profile_report['skewness'] = None
-
-                # 8. Kurtosis
-                logger.debug("Calculating kurtosis...")
-                try:
-                    profile_report['kurtosis'] = numeric_df.kurt().round(3).to_dict()
-                except Exception as e:
-                    logger.warning(f"Could not calculate kurtosis: {e}")
                     profile_report['kurtosis'] = None
 
                 # 9. Outlier Detection (DBSCAN)
                 logger.debug("Performing DBSCAN outlier detection...")
-                profile_report['outlier_detection'] = self._perform_dbscan(numeric_df, dbscan_params)
+                profile_report['outlier_detection'] = self._perform_dbscan(numeric_df, dbscan_params, scaled=scaled)
 
             else:
                 # Handle case with no numeric columns
@@ -180,10 +204,52 @@ class PreprocessingAgent:
             # Returning None indicates a more severe failure
             return None # Indicate a significant failure in profiling
 
+    def _count_duplicates(self, df: pd.DataFrame) -> int:
+        """
+        Counts fully duplicated rows from a 64-bit hash per row.
+
+        categorize=False skips factorizing object columns before hashing, which
+        is the dominant cost of duplicated() on wide frames. That path hashes object
+        values as strings, so it is only used where this gives duplicated()'s answer:
+        frames whose object columns hold strings (missing values in text columns are
+        hashed as a separate column naming their kind). Mixed-type object columns, where 1 and '1' differ,
+        fall back to duplicated().
+        """
+        hashed_columns = {}
+        for i, dtype in enumerate(df.dtypes):
+            column = df.iloc[:, i]
+            if pd.api.types.is_float_dtype(dtype):
+                column = column + 0.0 # -0.0 equals 0.0 in duplicated() but hashes differently
+            elif dtype == object or isinstance(dtype, pd.StringDtype):
+                if dtype == object and pd.api.types.infer_dtype(column, skipna=True) not in ('string', 'empty'):
+                    return int(df.duplicated().sum())
+                missing = column.isna()
+                if missing.any():
+                    # A missing value is not the text 'None', and duplicated() tells None, NaN
+                    # and pd.NA apart in object columns, so the kind of missing value is hashed
+                    missing_kind = pd.Series('', index=column.index, dtype=object)
+                    missing_kind[missing] = column[missing].map(lambda value: type(value).__name__)
+                    column = column.where(~missing, '')
+                    hashed_columns[f'{i}_missing'] = missing_kind
+            hashed_columns[str(i)] = column
+        if not hashed_columns:
+            return int(df.duplicated().sum())
+        row_hashes = pd.util.hash_pandas_object(pd.DataFrame(hashed_columns), index=False, categorize=False)
+        return int(row_hashes.size - row_hashes.nunique()) # Ensure standard int type
+
     def _get_memory_usage(self, df: pd.DataFrame) -> str:
         """Calculates and formats memory usage."""
         try:
-            mem = df.memory_usage(index=True, deep=True).sum()
+            n_rows = len(df)
+            has_object_cols = (df.dtypes == object).any()
+            if n_rows > self.MEMORY_SAMPLE_ROWS and has_object_cols:
+                # deep=True walks every Python string; scale up a sample instead
+                sample = df.sample(self.MEMORY_SAMPLE_ROWS, random_state=0)
+                sampled = sample.memory_usage(index=False, deep=True).sum() * (n_rows / self.MEMORY_SAMPLE_ROWS)
+                mem = int(sampled + df.index.memory_usage(deep=True))
+                logger.debug(f"Memory usage estimated from a {self.MEMORY_SAMPLE_ROWS}-row sample.")
+            else:
+                mem = df.memory_usage(index=True, deep=True).sum()
             if mem < 1024:
                 return f"{mem} Bytes"
             elif mem < 1024**2:
@@ -196,13 +262,137 @@ class PreprocessingAgent:
             logger.warning(f"Could not calculate memory usage: {e}")
             return "N/A" # Handle potential errors in memory calculation
 
-    def _perform_dbscan(self, numeric_df: pd.DataFrame, params: dict) -> dict:
+    def _describe_categorical(self, cat_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Runs describe() on the categorical/object columns.
+
+        Plain object columns are first cast to Arrow-backed strings (when pyarrow is
+        available) so the unique/top/freq counting runs in Arrow's C++ kernels instead
+        of hashing Python objects. Columns holding mixed types cannot be cast and fall
+        back to the regular pandas path.
+        """
+        if PYARROW_AVAILABLE:
+            str_cols = cat_df.columns[cat_df.dtypes == object]
+            if not str_cols.empty:
+                try:
+                    arrow_string = pd.ArrowDtype(pa.string())
+                    return cat_df.astype({col: arrow_string for col in str_cols}).describe()
+                except Exception as e:
+                    logger.debug(f"Arrow string cast failed for categorical describe, using pandas: {e}")
+        return cat_df.describe()
+
+    def _cardinality(self, df: pd.DataFrame) -> dict:
+        """
+        Counts distinct non-null values per column.
+
+        Text columns are counted with Arrow's native count_distinct kernel when pyarrow
+        is available, which avoids building Python hash sets of strings; every other
+        column (and any text column Arrow can't convert) uses Series.nunique(), which
+        is already cheap for numeric data and treats 0.0 and -0.0 as one value.
+        """
+        cardinality = {}
+        for i, (col, dtype) in enumerate(df.dtypes.items()):
+            column = df.iloc[:, i]
+            if PYARROW_AVAILABLE and (dtype == object or pd.api.types.is_string_dtype(dtype)):
+                try:
+                    values = pa.array(column, from_pandas=True)
+                    if pa.types.is_string(values.type) or pa.types.is_large_string(values.type):
+                        cardinality[col] = int(pc.count_distinct(values).as_py())
+                        continue
+                except Exception as e:
+                    logger.debug(f"Arrow cardinality failed for column '{col}', using pandas: {e}")
+            cardinality[col] = int(column.nunique())
+        return cardinality
+
+    def _correlation_matrix(self, numeric_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Computes the Pearson correlation matrix of the numeric columns.
+
+        When the data has no missing values, the matrix is computed with a single
+        BLAS-backed np.corrcoef call; otherwise pandas' pairwise-complete path is
+        used so results stay identical to DataFrame.corr().
+        """
+        arr = numeric_df.to_numpy(dtype=np.float64, na_value=np.nan)
+        if arr.shape[0] < 2 or np.isnan(arr).any():
+            return numeric_df.corr()
+        with np.errstate(divide='ignore', invalid='ignore'): # Constant columns yield NaN, as in pandas
+            corr = np.corrcoef(arr, rowvar=False)
+        return pd.DataFrame(corr, index=numeric_df.columns, columns=numeric_df.columns)
+
+    def _skew_kurtosis(self, numeric_df: pd.DataFrame) -> tuple[pd.Series, pd.Series, Optional[np.ndarray]]:
+        """
+        Computes bias-corrected skewness and excess kurtosis for every numeric column.
+
+        Central moments are accumulated once over the column-major array (NaNs skipped
+        per column), so skew and kurtosis share the mean/variance work. Results match
+        pandas' DataFrame.skew() / DataFrame.kurt().
+
+        Returns:
+            tuple: (skewness, kurtosis, scaled). `scaled` is the z-scored matrix
+                   (equivalent to StandardScaler output) when the data has no missing
+                   values, so DBSCAN can reuse it; otherwise None.
+        """
+        if numeric_df.shape[1] == 1:
+            return self._skew_kurtosis_single(numeric_df)
+
+        arr = numeric_df.to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(arr)
+        n = valid.sum(axis=0).astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(valid, arr, 0.0).sum(axis=0) / n
+            dev = np.where(valid, arr - mean, 0.0)
+            dev2 = dev * dev
+            m2 = dev2.sum(axis=0)
+            m3 = (dev2 * dev).sum(axis=0)
+            m4 = (dev2 * dev2).sum(axis=0)
+
+            skew = (n * np.sqrt(n - 1) / (n - 2)) * (m3 / m2 ** 1.5)
+            kurt = (n * (n + 1) * (n - 1) * m4) / ((n - 2) * (n - 3) * m2 ** 2) \
+                - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+        # Constant columns report 0 (as pandas does); too few observations report NaN
+        skew = np.where(m2 == 0, 0.0, skew)
+        kurt = np.where(m2 == 0, 0.0, kurt)
+        skew[n < 3] = np.nan
+        kurt[n < 4] = np.nan
+
+        scaled = None
+        if valid.all():
+            std = np.sqrt(m2 / n)
+            scaled = dev / np.where(std == 0, 1.0, std) # StandardScaler leaves constant columns unscaled
+        return (pd.Series(skew, index=numeric_df.columns),
+                pd.Series(kurt, index=numeric_df.columns),
+                scaled)
+
+    def _skew_kurtosis_single(self, numeric_df: pd.DataFrame) -> tuple[pd.Series, pd.Series, Optional[np.ndarray]]:
+        """Single-column variant of _skew_kurtosis using scipy.stats on the NaN-free 1-D array."""
+        col = numeric_df.columns[0]
+        values = numeric_df.iloc[:, 0].to_numpy(dtype=np.float64, na_value=np.nan)
+        has_nan = np.isnan(values).any()
+        values = values[~np.isnan(values)] if has_nan else values
+        n = len(values)
+        std = values.std() if n else 0.0
+
+        if n >= 3 and std == 0:
+            skew = kurt = 0.0 # Constant column, as reported by pandas
+        else:
+            skew = float(stats.skew(values, bias=False)) if n >= 3 else np.nan
+            kurt = float(stats.kurtosis(values, bias=False)) if n >= 4 else np.nan
+
+        scaled = None
+        if not has_nan:
+            scaled = ((values - values.mean()) / (std if std else 1.0)).reshape(-1, 1)
+        return pd.Series({col: skew}), pd.Series({col: kurt}), scaled
+
+    def _perform_dbscan(self, numeric_df: pd.DataFrame, params: dict, scaled: Optional[np.ndarray] = None) -> dict:
         """
         Performs DBSCAN clustering on numeric columns to identify outliers.
 
         Args:
             numeric_df (pd.DataFrame): DataFrame containing only numeric columns.
             params (dict): Dictionary with 'eps' and 'min_samples'.
+            scaled (np.ndarray, optional): Already standardized values of `numeric_df`
+                                           (only valid when it has no NaNs). Skips the
+                                           StandardScaler pass when provided.
 
         Returns:
             dict: Results including outlier count, percentage, and parameters used.
@@ -237,9 +427,12 @@ class PreprocessingAgent:
             return results
 
         try:
-            # 1. Scale the data
-            scaler = StandardScaler()
-            scaled_data = scaler.fit_transform(numeric_df_clean)
+            # 1. Scale the data (reuse the matrix from profile() if it was passed in)
+            if scaled is not None and dropped_count == 0:
+                scaled_data = scaled
+            else:
+                scaler = StandardScaler()
+                scaled_data = scaler.fit_transform(numeric_df_clean)
             logger.debug(f"DBSCAN: Scaled data shape: {scaled_data.shape}")
 
             # 2. Apply DBSCAN
@@ -8,20 +8,41 @@ Defines the ReportingAgent class responsible for displaying analysis results
 
 
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image # Installed with matplotlib; encodes the rendered heatmap
 import seaborn as sns
 from fpdf import FPDF # For PDF generation
+from fpdf.fonts import FontFace
 import io # For handling bytes buffer for plots
 from datetime import datetime
 import numpy as np # For numerical operations
 import math # For ceil function in PDF table pagination
 import logging # Import logging
+import threading
+import hashlib
+import json
+from collections import OrderedDict
 from typing import Dict, Optional
 # import traceback # No longer needed with logger.error(exc_info=True)
 
 # Get a logger specific to this module
 logger = logging.getLogger(__name__)
 
+# Initial size of the in-memory PNG buffer for the correlation heatmap (typical images are well below this)
+HEATMAP_PNG_PREALLOC_BYTES = 256 * 1024
+
+# Above this many columns the per-cell value labels are unreadable and dominate draw time
+HEATMAP_MAX_ANNOTATED_COLUMNS = 12
+
+# Recently generated PDFs kept in memory, keyed by a hash of their input
+PDF_CACHE_SIZE = 8
+PDF_CACHE_MAX_REPORT_BYTES = 10 * 1024 * 1024 # Larger reports are not worth hashing/holding
+
+# Element-wise helpers for preparing PDF table cells on object arrays
+_TO_CELL_TEXT = np.frompyfunc(lambda item: item if isinstance(item, str) else str(item), 1, 1)
+_TEXT_LEN = np.frompyfunc(len, 1, 1)
+
 class ReportingAgent:
     """
     Agent responsible for presenting analysis results in the UI
@@ -32,6 +53,13 @@ class ReportingAgent:
         """Initializes the ReportingAgent."""
         # No specific state needed currently
         self.pdf_col_width = 55 # Define standard column width for PDF tables
+        # Heatmap figure/axes are created lazily on first use and reused across reports
+        self._fig = None
+        self._canvas = None
+        self._ax = None
+        self._plot_lock = threading.Lock()
+        self._pdf_cache = OrderedDict() # (report digest, name, generation minute) -> PDF bytes, least recently used first
+        self._pdf_cache_lock = threading.Lock()
         logger.debug("ReportingAgent initialized.")
 
     # --- UI Display Methods ---
@@ -44,13 +72,24 @@ class ReportingAgent:
         """Converts object columns to string safely for display/output."""
         if not isinstance(df, (pd.DataFrame, pd.Series)):
             return df # Return original if not pandas object
-        display_df = df.copy()
+        if isinstance(df, pd.DataFrame):
+            obj_cols = df.select_dtypes(include=['object']).columns
+            if obj_cols.empty:
+                return df # Nothing to convert
+        elif df.dtype != 'object':
+            return df # Series is already display-ready
+        # Shallow copy: only the object columns are replaced below, the rest share memory
+        display_df = df.copy(deep=False)
         if isinstance(display_df, pd.DataFrame):
-            for col in display_df.select_dtypes(include=['object']).columns:
+            try:
+                # Convert all object columns in one call rather than column by column
+                display_df[obj_cols] = display_df[obj_cols].astype(str)
+            except Exception as e:
+                logger.warning(f"Bulk string conversion failed, converting cell by cell for display: {e}")
                 try:
-                    display_df[col] = display_df[col].astype(str)
+                    display_df[obj_cols] = display_df[obj_cols].map(str)
                 except Exception as e:
-                    logger.warning(f"Could not convert column '{col}' to string for display: {e}")
+                    logger.warning(f"Could not convert object columns to string for display: {e}")
                     pass # Ignore conversion errors for display prep
         elif isinstance(display_df, pd.Series) and display_df.dtype == 'object':
             try:
@@ -77,17 +116,49 @@ class ReportingAgent:
             logger.error("Cannot generate PDF: No profiling report data provided.")
             return None
 
+        # Repeated downloads of an unchanged report are served from the cache. The "Generated on"
+        # stamp is part of the key (to the minute, as printed), so a cached PDF never shows an
+        # earlier time than a fresh one would
+        generated_on = datetime.now().strftime('%Y-%m-%d %H:%M')
+        cache_key = None
+        try:
+            report_json = json.dumps(report, sort_keys=True, default=str)
+            if len(report_json) <= PDF_CACHE_MAX_REPORT_BYTES:
+                digest = hashlib.blake2b(report_json.encode(), digest_size=16).hexdigest()
+                cache_key = (digest, dataframe_name, generated_on)
+        except Exception as e:
+            logger.warning(f"Could not hash profiling report for PDF cache, generating uncached: {e}")
+
+        if cache_key is not None:
+            with self._pdf_cache_lock:
+                cached_pdf = self._pdf_cache.get(cache_key)
+                if cached_pdf is not None:
+                    self._pdf_cache.move_to_end(cache_key)
+                    logger.info(f"Serving cached PDF report for '{dataframe_name}'.")
+                    return cached_pdf
+
+        pdf_bytes = self._render_report_pdf(report, dataframe_name, generated_on)
+
+        if cache_key is not None and pdf_bytes is not None:
+            with self._pdf_cache_lock:
+                self._pdf_cache[cache_key] = pdf_bytes
+                self._pdf_cache.move_to_end(cache_key)
+                while len(self._pdf_cache) > PDF_CACHE_SIZE:
+                    self._pdf_cache.popitem(last=False)
+        return pdf_bytes
+
+    def _render_report_pdf(self, report: dict, dataframe_name: str, generated_on: str) -> Optional[bytes]:
+        """Builds the PDF for generate_report_pdf, bypassing the cache."""
         logger.info(f"Starting PDF report generation for '{dataframe_name}'...")
         try:
             pdf = FPDF()
             pdf.add_page()
-            pdf.set_font("Helvetica", size=12)
 
             # --- Title ---
             pdf.set_font("Helvetica", "B", 16)
             pdf.cell(0, 10, f"Data Profiling Report: {dataframe_name}", ln=True, align='C')
             pdf.set_font("Helvetica", size=8)
-            pdf.cell(0, 5, f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True, align='C')
+            pdf.cell(0, 5, f"Generated on: {generated_on}", ln=True, align='C')
             pdf.ln(10)
 
             # --- Overview Section ---
@@ -106,11 +177,15 @@ class ReportingAgent:
             self._add_pdf_section_title(pdf, "Missing Values Summary")
             missing_data = report.get('missing_values', {})
             if missing_data:
-                missing_df = pd.DataFrame.from_dict(missing_data, orient='index')
-                missing_df.columns = ['Count', 'Percentage (%)']
-                missing_df = missing_df[missing_df['Count'] > 0].sort_values(by='Percentage (%)', ascending=False)
-                if not missing_df.empty:
-                    self._add_df_to_pdf(pdf, missing_df.reset_index().rename(columns={'index': 'Column'}), title="Columns with Missing Values")
+                # Filter and sort the small dict in Python; build a DataFrame only for the rendered rows
+                missing_rows = [
+                    (col, info['count'], info['percentage'])
+                    for col, info in missing_data.items() if info['count'] > 0
+                ]
+                missing_rows.sort(key=lambda row: row[2], reverse=True)
+                if missing_rows:
+                    missing_df = pd.DataFrame(missing_rows, columns=['Column', 'Count', 'Percentage (%)'])
+                    self._add_df_to_pdf(pdf, missing_df, title="Columns with Missing Values")
                 else:
                     pdf.cell(0, 5, "No missing values found.", ln=True)
             else:
@@ -122,10 +197,13 @@ class ReportingAgent:
             numeric_stats_data = report.get('descriptive_stats', {}).get('numeric')
             if numeric_stats_data:
                 try:
-                    numeric_stats_df = pd.DataFrame(numeric_stats_data)
                     # Select key stats for summary (e.g., mean, std, min, max) - adjust as needed
-                    summary_stats = numeric_stats_df.loc[['mean', 'std', 'min', '25%', '50%', '75%', 'max']].reset_index()
-                    summary_stats.rename(columns={'index': 'Statistic'}, inplace=True)
+                    # Rows are pulled straight from the {column: {stat: value}} dict, so the
+                    # summary table is built in one allocation without an intermediate frame
+                    stat_cols = list(numeric_stats_data)
+                    rows = [[stat] + [numeric_stats_data[col][stat] for col in stat_cols]
+                            for stat in ('mean', 'std', 'min', '25%', '50%', '75%', 'max')]
+                    summary_stats = pd.DataFrame(rows, columns=['Statistic'] + stat_cols)
                     self._add_df_to_pdf(pdf, summary_stats, title="Numeric Statistics Summary", max_cols=4) # Show fewer columns
                 except KeyError as ke:
                      logger.warning(f"Could not display numeric stats in PDF, missing expected index: {ke}")
@@ -242,51 +320,67 @@ class ReportingAgent:
         # Ensure minimum width? Maybe not necessary, let FPDF handle wrapping.
         col_widths = [col_width] * num_cols
 
-        # Header
-        pdf.set_fill_color(224, 235, 255) # Light blue background
-        for i, col_name in enumerate(cols):
-            pdf.cell(col_widths[i], 7, str(col_name), border=1, align='C', fill=True)
-        pdf.ln()
-
-        # Data rows
-        pdf.set_fill_color(255, 255, 255) # White background
-        fill = False
         df_safe = self._safe_convert_to_str(df_to_render) # Ensure strings
-        for index, row in df_safe.iterrows():
-            # Calculate max height needed for this row (due to potential wrapping)
-            row_height = 7 # Default height
-            # This part is tricky with FPDF's basic cell; multi_cell is better for wrapping
-            # but harder to align in a grid. We'll stick to basic cell and truncate.
-            # For proper wrapping, a more complex table drawing logic would be needed.
-
-            for i, item in enumerate(row):
-                # Truncate long strings within cells
-                cell_text = str(item)
-                max_chars_per_cell = 40 # Adjust based on typical col_width
-                if len(cell_text) > max_chars_per_cell:
-                    cell_text = cell_text[:max_chars_per_cell-3] + '...'
-                pdf.cell(col_widths[i], row_height, cell_text, border=1, align='L', fill=fill) # Left align data
-            pdf.ln()
-            fill = not fill # Alternate row fill
+        max_chars_per_cell = 40 # Adjust based on typical col_width
+
+        # Prepare every cell's text up front as one 2-D object array: stringify
+        # (numeric columns are not stringified upstream), then truncate long strings
+        # with a single mask instead of branching per cell inside the drawing loop.
+        cell_texts = _TO_CELL_TEXT(df_safe.to_numpy(dtype=object))
+        too_long = _TEXT_LEN(cell_texts).astype(int) > max_chars_per_cell
+        if too_long.any():
+            cell_texts[too_long] = [text[:max_chars_per_cell-3] + '...' for text in cell_texts[too_long]]
+
+        # fpdf2's table API lays out the grid itself (borders, row heights, page breaks)
+        # so we only hand it row lists instead of positioning every cell by hand.
+        # col_widths are only proportions to fpdf2, so the total width and left
+        # alignment are passed explicitly to keep the fixed-width layout.
+        headings_style = FontFace(fill_color=(224, 235, 255)) # Light blue header, regular weight
+        with pdf.table(col_widths=tuple(col_widths), width=sum(col_widths), align='LEFT',
+                       text_align='LEFT', line_height=5,
+                       headings_style=headings_style) as table:
+            header = table.row()
+            for col_name in cols:
+                header.cell(str(col_name), align='C')
+            for row in cell_texts:
+                table.row(row.tolist())
 
     def _generate_plot_image_buffer(self, corr_df: pd.DataFrame) -> io.BytesIO | None:
          """Generates a plot image in memory."""
          logger.debug("Generating correlation heatmap image for PDF...")
-         try:
-             fig, ax = plt.subplots(figsize=(8, 6)) # Adjust size as needed
-             mask = np.triu(np.ones_like(corr_df, dtype=bool))
-             sns.heatmap(corr_df, annot=True, fmt=".2f", cmap='coolwarm', ax=ax, mask=mask, linewidths=.5, cbar=False) # No cbar for smaller pdf image
-             plt.xticks(rotation=45, ha='right')
-             plt.yticks(rotation=0)
-             plt.tight_layout()
-
-             img_buffer = io.BytesIO()
-             fig.savefig(img_buffer, format='png', dpi=150) # Save to buffer
-             img_buffer.seek(0)
-             plt.close(fig) # Close plot to free memory
-             logger.debug("Correlation heatmap image generated successfully.")
-             return img_buffer
-         except Exception as e:
-             logger.error(f"Could not generate plot image buffer: {e}", exc_info=True)
-             plt.close(fig) # Ensure plot is closed even on error
-             return None
\ No newline at end of file
+         with self._plot_lock: # The cached figure is shared across requests
+             try:
+                 if self._fig is None:
+                     # Built once and reused; a bare Figure bypasses pyplot's global registry
+                     self._fig = Figure(figsize=(8, 6), dpi=100) # Adjust size as needed
+                     self._canvas = FigureCanvasAgg(self._fig)
+                     self._ax = self._fig.add_subplot(111)
+                 fig, ax = self._fig, self._ax
+                 ax.clear()
+
+                 mask = np.triu(np.ones_like(corr_df, dtype=bool))
+                 annot = corr_df.shape[0] <= HEATMAP_MAX_ANNOTATED_COLUMNS # Skip O(N^2) text artists on wide matrices
+                 sns.heatmap(corr_df, annot=annot, fmt=".2f", cmap='coolwarm', ax=ax, mask=mask, linewidths=.5, cbar=False) # No cbar for smaller pdf image
+                 ax.tick_params(axis='x', labelrotation=45)
+                 for label in ax.get_xticklabels():
+                     label.set_horizontalalignment('right')
+                 ax.tick_params(axis='y', labelrotation=0)
+                 fig.tight_layout()
+
+                 # Start from a preallocated buffer so PIL's chunked writes overwrite in
+                 # place instead of repeatedly growing the BytesIO
+                 img_buffer = io.BytesIO(bytes(HEATMAP_PNG_PREALLOC_BYTES))
+                 # Render straight to the Agg pixel buffer and hand it to PIL as RGB: this
+                 # skips savefig's extra print pass and the alpha channel (which FPDF would
+                 # otherwise split out into a soft mask). Fast zlib level: the PNG is embedded
+                 # once in the PDF and then discarded, so a slightly larger image is fine.
+                 self._canvas.draw()
+                 rgba = np.asarray(self._canvas.buffer_rgba())
+                 Image.fromarray(rgba[..., :3]).save(img_buffer, format='PNG', compress_level=1, optimize=False) # Save to buffer
+                 img_buffer.truncate(img_buffer.tell()) # Drop unused preallocated tail
+                 img_buffer.seek(0)
+                 logger.debug("Correlation heatmap image generated successfully.")
+                 return img_buffer
+             except Exception as e:
+                 logger.error(f"Could not generate plot image buffer: {e}", exc_info=True)
+                 return None
\ No newline at end of file
@@ -7,20 +7,165 @@ specifically Named Entity Recognition (NER), on selected DataFrame columns using
 """
 
 
+import os
+import re
+import threading
 import pandas as pd
 import spacy
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 # import traceback # No longer needed with logger.error(exc_info=True)
 import logging # Import logging
 
+from worker_processes import get_worker_context
+
 # Get a logger specific to this module
 logger = logging.getLogger(__name__)
 
+# Collapses whitespace runs when normalizing entity text
+_WS_RE = re.compile(r'\s+')
+
+# nlp.pipe batch sizes, in-process and in worker processes; NER_BATCH_SIZE overrides both
+PIPE_BATCH_SIZE = int(os.environ.get("NER_BATCH_SIZE", 1000))
+MULTIPROCESS_BATCH_SIZE = int(os.environ.get("NER_BATCH_SIZE", 64))
+# A large column is sent to worker processes in chunks of this many batches; small chunks
+# keep every worker busy instead of waiting on one big one
+MULTIPROCESS_CHUNK_BATCHES = 4
+
+# Pipeline components that set doc.ents; everything else is only kept if one of these listens to it
+_ENTITY_PIPES = ("ner", "entity_ruler")
+
+# spaCy models owned by a NER worker process, by name; each is loaded once per worker
+_worker_models = {}
+
+
+def _load_ner_pipeline(model_name: str, disabled_pipes: list[str]):
+    """Loads a spaCy model with only the components NER depends on left enabled."""
+    nlp = spacy.load(model_name, disable=disabled_pipes)
+    # Only doc.ents is consulted, so switch off any remaining component that neither sets
+    # entities nor feeds one that does. A shared tok2vec/transformer stays when NER listens
+    # to it; en_core_web_sm's NER embeds its own tok2vec, so there the shared one goes.
+    for name in list(nlp.pipe_names):
+        if name in _ENTITY_PIPES:
+            continue
+        listeners = getattr(nlp.get_pipe(name), "listening_components", None) or []
+        if not any(listener in _ENTITY_PIPES for listener in listeners):
+            nlp.disable_pipe(name)
+    return nlp
+
+
+def _get_worker_model(model_name: str, disabled_pipes: list[str]):
+    """Returns the worker process's copy of a spaCy model, loading it on first use."""
+    nlp = _worker_models.get(model_name)
+    if nlp is None:
+        nlp = _worker_models[model_name] = _load_ner_pipeline(model_name, disabled_pipes)
+    return nlp
+
+
+def _init_ner_worker(model_name: str, disabled_pipes: list[str]):
+    """Process-pool initializer: preloads the configured spaCy model in each worker process."""
+    _get_worker_model(model_name, disabled_pipes)
+
+
+def _analyze_column_in_worker(model_name: str, disabled_pipes: list[str], texts: list[str],
+                              counts: list[int], col_name: str) -> dict:
+    """Runs NER for one column inside a worker process using the worker's model."""
+    return _count_entities(_get_worker_model(model_name, disabled_pipes), texts, counts, col_name)
+
+
+def _tally_chunk_in_worker(model_name: str, disabled_pipes: list[str], texts: list[str],
+                           counts: list[int], col_name: str) -> tuple[Counter, Counter]:
+    """Tallies entities for one chunk of a large column inside a worker process."""
+    return _tally_entities(_get_worker_model(model_name, disabled_pipes), texts, counts, col_name,
+                           batch_size=MULTIPROCESS_BATCH_SIZE)
+
+
+def _tally_entities(nlp, texts: list[str], counts: list[int], col_name: str, batch_size: int = PIPE_BATCH_SIZE,
+                    cancel_event=None) -> tuple[Counter, Counter] | None:
+    """
+    Runs the spaCy pipeline over distinct texts and counts entities by label name and by
+    normalized text, weighting each text's entities by how many rows (counts) contain it.
+    Returns None if cancel_event is set while the texts are processed.
+    """
+    label_counts = Counter() # Keyed by the integer label ID; names are resolved once at the end
+    top_entities_counter = Counter() # Updated as docs stream in, no list of every mention
+    normalized_texts = {} # Raw entity text -> normalized form; the same mentions recur across rows
+
+    # Process text in batches using nlp.pipe for efficiency
+    # Adjust batch_size based on memory constraints and text length
+    doc_count = 0
+    for doc, multiplicity in zip(nlp.pipe(texts, batch_size=batch_size), counts):
+        doc_count += 1
+        # Keep just the label IDs and texts and drop the Doc right away, so its token
+        # arrays are freed before nlp.pipe builds the next one
+        entities = [(ent.label, ent.text) for ent in doc.ents]
+        del doc
+        for label, raw_text in entities:
+            label_counts[label] += multiplicity
+            # Store text and label for finding top entities later
+            # Normalize whitespace and case for better aggregation
+            entity_text = normalized_texts.get(raw_text)
+            if entity_text is None:
+                entity_text = normalized_texts[raw_text] = _WS_RE.sub(' ', raw_text).strip().lower()
+            if entity_text: # Avoid adding empty strings
+                top_entities_counter[entity_text] += multiplicity
+
+        if doc_count % batch_size == 0 and cancel_event is not None and cancel_event.is_set():
+            logger.info(f"NER for column '{col_name}' cancelled after {doc_count} entries.")
+            return None
+
+        # Optional: Provide progress feedback for large columns
+        if doc_count % (batch_size * 10) == 0: # Every 10 batches
+             logger.debug(f"   ...processed {doc_count} entries in '{col_name}'")
+
+    logger.debug(f"Finished processing {doc_count} distinct entries in '{col_name}'.")
+    entities_by_type = Counter({nlp.vocab.strings[label]: count for label, count in label_counts.items()})
+    return entities_by_type, top_entities_counter
+
+
+def _summarize_entities(entities_by_type: Counter, top_entities_counter: Counter, col_name: str) -> dict:
+    """Builds a column's NER report from its entity tallies."""
+    # Find top N most frequent specific entities
+    top_n = 20 # Number of top entities to show
+    top_entities_list = top_entities_counter.most_common(top_n)
+
+    logger.debug(f"NER results for '{col_name}': Types={len(entities_by_type)}, TopEntities={len(top_entities_list)}")
+    return {
+        'entities_by_type': dict(entities_by_type),
+        'top_entities': top_entities_list
+    }
+
+
+def _count_entities(nlp, texts: list[str], counts: list[int], col_name: str, cancel_event=None) -> dict | None:
+    """
+    Runs NER over a column's distinct texts in this process and returns the column's report.
+    Returns None if cancel_event is set while the column is processed.
+    """
+    tallies = _tally_entities(nlp, texts, counts, col_name, cancel_event=cancel_event)
+    if tallies is None:
+        return None
+    return _summarize_entities(*tallies, col_name)
+
+
 class TextAnalysisAgent:
     """
     Agent responsible for performing text analysis tasks like NER.
     """
-    SPACY_MODEL_NAME = "en_core_web_sm" # Use the small English model
+    # Use the small English model unless NER_MODEL selects another (e.g. en_core_web_md/trf)
+    SPACY_MODEL_NAME = os.environ.get("NER_MODEL", "en_core_web_sm")
+    # Short cells gain little from a larger model, so they always go through the small one
+    FAST_SPACY_MODEL_NAME = "en_core_web_sm"
+    SHORT_TEXT_MEDIAN_CHARS = 200
+    # Disable components we don't need for NER to speed up processing
+    # Adjust based on actual needs if using other components later.
+    # tok2vec stays loaded: NER may listen to it, see _load_ner_pipeline
+    DISABLED_PIPES = ["tagger", "parser", "attribute_ruler", "lemmatizer", "senter"]
+    # Below this many distinct texts (per column, or across all columns), starting worker
+    # processes costs more than it saves
+    MULTIPROCESS_MIN_TEXTS = 2000
+    WARMUP_TEXT = "Ada Lovelace visited London in 1842."
+    # NER_N_PROCESS=1 keeps NER in the web worker's process; as in spaCy, -1 (or 0) uses all cores
+    MULTIPROCESS_MAX_WORKERS = int(os.environ.get("NER_N_PROCESS", 8))
 
     def __init__(self):
         """Initializes the TextAnalysisAgent and loads the spaCy model."""
@@ -30,20 +175,24 @@ class TextAnalysisAgent:
         else:
             # Error logged by _load_spacy_model
             pass
+        self._fast_nlp = None # Loaded on first short-text column when NER_MODEL is not the fast model
 
-    def _load_spacy_model(self):
-        """Loads the specified spaCy language model."""
+    def _load_spacy_model(self, model_name: str | None = None):
+        """Loads the specified spaCy language model (the configured one by default)."""
+        model_name = model_name or self.SPACY_MODEL_NAME
         try:
-            logger.info(f"Attempting to load spaCy model: {self.SPACY_MODEL_NAME}")
-            # Disable components we don't need for NER to speed up processing
-            # Adjust based on actual needs if using other components later.
-            disabled_pipes = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer"]
-            return spacy.load(self.SPACY_MODEL_NAME, disable=disabled_pipes)
+            logger.info(f"Attempting to load spaCy model: {model_name}")
+            nlp = _load_ner_pipeline(model_name, self.DISABLED_PIPES)
+            logger.debug(f"Active spaCy pipes: {nlp.pipe_names}")
+            # One tiny doc at load time does the pipeline's lazy first-call setup here, at
+            # startup, instead of inside the first NER request
+            nlp(self.WARMUP_TEXT)
+            return nlp
         except OSError:
             logger.error(
-                f"spaCy model '{self.SPACY_MODEL_NAME}' not found. "
+                f"spaCy model '{model_name}' not found. "
                 f"Please download it by running:\n"
-                f"`python -m spacy download {self.SPACY_MODEL_NAME}`"
+                f"`python -m spacy download {model_name}`"
             )
             # Stop the app or return None to indicate failure
             # Returning None allows the calling code to handle the absence of the model
@@ -52,18 +201,56 @@ class TextAnalysisAgent:
             logger.error(f"An unexpected error occurred while loading the spaCy model: {e}", exc_info=True)
             return None
 
-    def analyze_entities(self, df: pd.DataFrame, columns_to_analyze: list[str]) -> dict | None:
+    def _model_for_column(self, column: pd.Series) -> str:
+        """Picks the spaCy model name for a column: the fast model for short texts, else the configured one."""
+        if self.SPACY_MODEL_NAME == self.FAST_SPACY_MODEL_NAME:
+            return self.SPACY_MODEL_NAME
+        if column.str.len().median() > self.SHORT_TEXT_MEDIAN_CHARS:
+            return self.SPACY_MODEL_NAME
+        if self._fast_nlp is None:
+            self._fast_nlp = self._load_spacy_model(self.FAST_SPACY_MODEL_NAME) or False
+        # Fall back to the configured model if the fast one is not installed
+        return self.FAST_SPACY_MODEL_NAME if self._fast_nlp else self.SPACY_MODEL_NAME
+
+    def _count_entities_in_workers(self, model_name: str, texts: list[str], counts: list[int], col_name: str,
+                                   max_workers: int, mp_context, cancel_event=None) -> dict | None:
+        """
+        Runs NER for one large column across worker processes: the distinct texts are split
+        into chunks, each worker tallies its chunks with its own model, and the tallies are
+        merged in chunk order (so ties rank as in a single pass). None if cancelled.
+        """
+        chunk_size = MULTIPROCESS_BATCH_SIZE * MULTIPROCESS_CHUNK_BATCHES
+        entities_by_type, top_entities_counter = Counter(), Counter()
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context, initializer=_init_ner_worker,
+                                 initargs=(model_name, self.DISABLED_PIPES)) as executor:
+            futures = [executor.submit(_tally_chunk_in_worker, model_name, self.DISABLED_PIPES,
+                                       texts[start:start + chunk_size], counts[start:start + chunk_size], col_name)
+                       for start in range(0, len(texts), chunk_size)]
+            for future in futures:
+                if cancel_event is not None and cancel_event.is_set():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    return None
+                chunk_by_type, chunk_entities = future.result()
+                entities_by_type.update(chunk_by_type)
+                top_entities_counter.update(chunk_entities)
+        return _summarize_entities(entities_by_type, top_entities_counter, col_name)
+
+    def analyze_entities(self, df: pd.DataFrame, columns_to_analyze: list[str],
+                         cancel_event: threading.Event | None = None) -> dict | None:
         """
         Performs Named Entity Recognition (NER) on the specified text columns.
 
         Args:
             df (pd.DataFrame): The DataFrame containing the text data.
             columns_to_analyze (list[str]): A list of column names to analyze.
+            cancel_event (threading.Event | None): When set, e.g. because a newer request
+                         superseded this one, analysis stops at the next column or batch.
 
         Returns:
             dict | None: A dictionary where keys are column names and values are
                          dicts containing 'entities_by_type' and 'top_entities'.
-                         Returns None if the spaCy model failed to load or on critical error.
+                         Returns None if the spaCy model failed to load, on critical error
+                         or when cancelled.
         """
         if self.nlp is None:
             logger.error("NER analysis cannot proceed because the spaCy model failed to load.")
@@ -80,6 +267,7 @@ class TextAnalysisAgent:
         logger.info(f"Starting NER analysis on columns: {columns_to_analyze}")
         ner_report = {}
 
+        column_texts = {}
         for col_name in columns_to_analyze:
             if col_name not in df.columns:
                 logger.warning(f"Column '{col_name}' selected for NER not found in DataFrame. Skipping.")
@@ -88,52 +276,92 @@ class TextAnalysisAgent:
 
             # Ensure the column is treated as string and handle NaNs
             try:
-                # Convert to string and fill NaN with empty string to avoid errors in nlp.pipe
-                texts = df[col_name].astype(str).fillna('').tolist()
-                if not texts:
+                column = df[col_name]
+                # Numeric, boolean and datetime columns hold no free text worth running NER on
+                if not (pd.api.types.is_string_dtype(column) or pd.api.types.is_object_dtype(column)
+                        or isinstance(column.dtype, pd.CategoricalDtype)):
+                    logger.info(f"Column '{col_name}' has non-text dtype '{column.dtype}'. Skipping NER.")
+                    ner_report[col_name] = {'entities_by_type': {}, 'top_entities': [], 'skipped': 'non-text dtype'}
+                    continue
+                # A clean object column (every value already a str, no NaN) is used as-is;
+                # otherwise missing values are dropped first (astype(str) would turn them into
+                # literal 'nan'/'None' texts for spaCy) and the rest converted to string
+                if column.dtype != object or pd.api.types.infer_dtype(column, skipna=False) != 'string':
+                    column = column.dropna().astype(str)
+                if column.empty:
                      logger.warning(f"Column '{col_name}' contains no text data after cleaning NaNs.")
                      ner_report[col_name] = {'entities_by_type': {}, 'top_entities': []}
                      continue
 
-                logger.debug(f"Processing column '{col_name}' with {len(texts)} text entries...")
-
-                entities_by_type = Counter()
-                all_entities = []
-
-                # Process text in batches using nlp.pipe for efficiency
-                # Adjust batch_size based on memory constraints and text length
-                batch_size = 1000
-                doc_count = 0
-                for doc in self.nlp.pipe(texts, batch_size=batch_size):
-                    doc_count += 1
-                    for ent in doc.ents:
-                        entities_by_type[ent.label_] += 1
-                        # Store text and label for finding top entities later
-                        # Normalize whitespace and case for better aggregation
-                        entity_text = ' '.join(ent.text.split()).lower()
-                        if entity_text: # Avoid adding empty strings
-                            all_entities.append(entity_text)
-
-                    # Optional: Provide progress feedback for large columns
-                    if doc_count % (batch_size * 10) == 0: # Every 10 batches
-                         logger.debug(f"   ...processed {doc_count} entries in '{col_name}'")
-
-                logger.debug(f"Finished processing {doc_count} entries in '{col_name}'.")
-
-                # Find top N most frequent specific entities
-                top_n = 20 # Number of top entities to show
-                top_entities_counter = Counter(all_entities)
-                top_entities_list = top_entities_counter.most_common(top_n)
-
-                ner_report[col_name] = {
-                    'entities_by_type': dict(entities_by_type), # Convert Counter to dict
-                    'top_entities': top_entities_list
-                }
-                logger.debug(f"NER results for '{col_name}': Types={len(entities_by_type)}, TopEntities={len(top_entities_list)}")
-
+                # Run each distinct text through spaCy once and weight its entities by
+                # multiplicity; sort=False keeps first-appearance order so ties rank as before
+                value_counts = column.value_counts(sort=False, dropna=False)
+                # Empty and whitespace-only texts cannot hold entities; drop them before spaCy
+                value_counts = value_counts[value_counts.index.str.strip() != '']
+                logger.debug(f"Processing column '{col_name}' with {len(column)} text entries ({len(value_counts)} distinct)...")
+                model_name = self._model_for_column(column)
+                column_texts[col_name] = (model_name, value_counts.index.tolist(), value_counts.tolist())
             except Exception as e:
                 logger.error(f"An error occurred during NER analysis for column '{col_name}': {e}", exc_info=True)
                 ner_report[col_name] = {"error": f"Analysis failed: {e}"}
 
+        # Worker processes come from a forkserver, never a fork of this multi-threaded web
+        # process (see worker_processes); without one, everything runs in-process.
+        # One core is left for the web worker itself.
+        mp_context = get_worker_context()
+        spare_cores = max(1, (os.cpu_count() or 1) - 1)
+        max_processes = self.MULTIPROCESS_MAX_WORKERS if self.MULTIPROCESS_MAX_WORKERS > 0 else spare_cores
+        process_limit = min(spare_cores, max_processes) if mp_context else 1
+        # Several columns with enough text between them on a multi-core host: spread them over
+        # worker processes, each loading its own model once. Only the text lists are sent,
+        # never the DataFrame.
+        total_texts = sum(len(texts) for _model_name, texts, _counts in column_texts.values())
+        max_workers = min(len(column_texts), process_limit)
+        if max_workers > 1 and total_texts >= self.MULTIPROCESS_MIN_TEXTS:
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context, initializer=_init_ner_worker,
+                                     initargs=(self.SPACY_MODEL_NAME, self.DISABLED_PIPES)) as executor:
+                futures = {col_name: executor.submit(_analyze_column_in_worker, model_name, self.DISABLED_PIPES,
+                                                     texts, counts, col_name)
+                           for col_name, (model_name, texts, counts) in column_texts.items()}
+                for col_name, future in futures.items():
+                    if cancel_event is not None and cancel_event.is_set():
+                        # Columns not yet started are dropped; running workers finish theirs
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        logger.info("NER analysis cancelled.")
+                        return None
+                    try:
+                        ner_report[col_name] = future.result()
+                    except Exception as e:
+                        logger.error(f"An error occurred during NER analysis for column '{col_name}': {e}", exc_info=True)
+                        ner_report[col_name] = {"error": f"Analysis failed: {e}"}
+        else:
+            for col_name, (model_name, texts, counts) in column_texts.items():
+                if cancel_event is not None and cancel_event.is_set():
+                    logger.info("NER analysis cancelled.")
+                    return None
+                nlp = self._fast_nlp if model_name != self.SPACY_MODEL_NAME else self.nlp
+                try:
+                    # Large single columns are split into chunks tallied by worker processes
+                    column_report = None
+                    if len(texts) >= self.MULTIPROCESS_MIN_TEXTS and process_limit > 1:
+                        try:
+                            column_report = self._count_entities_in_workers(model_name, texts, counts, col_name,
+                                                                            process_limit, mp_context, cancel_event)
+                        except Exception as e:
+                            logger.warning(f"Multi-process NER failed for column '{col_name}' ({e}); retrying in-process.")
+                            column_report = _count_entities(nlp, texts, counts, col_name, cancel_event=cancel_event)
+                    else:
+                        column_report = _count_entities(nlp, texts, counts, col_name, cancel_event=cancel_event)
+                    if column_report is None: # Cancelled
+                        logger.info("NER analysis cancelled.")
+                        return None
+                    ner_report[col_name] = column_report
+                except Exception as e:
+                    logger.error(f"An error occurred during NER analysis for column '{col_name}': {e}", exc_info=True)
+                    ner_report[col_name] = {"error": f"Analysis failed: {e}"}
+
+        # Report columns in the order they were requested
+        ner_report = {col_name: ner_report[col_name] for col_name in columns_to_analyze if col_name in ner_report}
+
         logger.info("NER analysis complete for selected columns.")
-        return ner_report
\ No newline at end of file
+        return ner_report
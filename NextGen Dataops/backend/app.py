@@ -1,48 +1,80 @@
 # backend/app.py
 
 import os
+import re
 import uuid
 import io
 import traceback
 import logging
 from pathlib import Path
 import json
-import base64 # For sending plot image data
-from io import BytesIO
+import pickle
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 from flask import send_file
 
 # Flask and extensions
-from flask import Flask, request, jsonify, session, Response as FlaskResponse, send_file, make_response
+from flask import Flask, request, jsonify, session, Response as FlaskResponse, send_file, make_response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_session import Session # Server-side sessions
 from flask_cors import CORS # For development communication with React frontend
 from werkzeug.utils import secure_filename # For safer filename handling
 
 # Data handling
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.compute as pc
+
+# Excel export: xlsxwriter can stream rows to disk in constant-memory mode; openpyxl is the fallback
+try:
+    import xlsxwriter
+    XLSXWRITER_AVAILABLE = True
+except ImportError:
+    xlsxwriter = None # type: ignore
+    XLSXWRITER_AVAILABLE = False
+
+# JSON responses and data previews: orjson serializes in C; the stdlib json module is the fallback
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None # type: ignore
+    ORJSON_AVAILABLE = False
+
+# Sessions: kept in Redis when REDIS_URL is set (needs the redis package), else on the filesystem
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None # type: ignore
+    REDIS_AVAILABLE = False
 
 # --- Import Agents (Ensure paths are correct) ---
 try:
     from agents.file_loading_agent import FileLoadingAgent
     from agents.preprocessing_agent import PreprocessingAgent
-    from agents.reporting_agent import ReportingAgent
     # *** Import the updated DatabaseAgent ***
     from agents.database_agent import DatabaseAgent
     from agents.text_analysis_agent import TextAnalysisAgent
     from agents.cleaning_agent import CleaningAgent
     from agents.feature_engineering_agent import FeatureEngineeringAgent
-    # *** Import NLtoSQLAgent and NLAnswerAgent ***
-    from agents.llm.nl_to_sql_agent import NLtoSQLAgent
-    from agents.llm.nl_answer_agent import NLAnswerAgent # New
-    from agents.llm.nl_to_viz_agent import NLtoVizAgent
-    from agents.llm.insight_agent import InsightAgent
-    from agents.plotting_agent import PlottingAgent
+    # LLM, plotting and reporting agents are imported lazily, see "Lazy Agents" below
 except ImportError as e:
     # Use basic logging here as app logger might not be configured yet
     logging.critical(f"CRITICAL ERROR: Failed to import agents. Check paths and dependencies. {e}")
     exit(1)
 
+from worker_processes import get_worker_context, disable_worker_processes
+
 # Import Constants
 try:
     from constants import (
@@ -57,8 +89,37 @@ except ImportError as e:
      exit(1)
 
 
+class OrjsonJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson, falling back to the default provider for anything orjson rejects."""
+    # Sorted keys and Flask's date/Decimal/UUID handling (via default) keep responses as before
+    ORJSON_OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+                      | orjson.OPT_PASSTHROUGH_DATETIME) if ORJSON_AVAILABLE else 0
+
+    def _orjson_dumps(self, obj, indent: bool = False) -> bytes:
+        option = self.ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs) -> str:
+        if not kwargs: # Custom json.dumps arguments are left to the default provider
+            try:
+                return self._orjson_dumps(obj).decode()
+            except TypeError: # e.g. integers beyond 64 bits
+                pass
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        try:
+            body = self._orjson_dumps(obj, indent=indent)
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
 # --- App Initialization & Configuration ---
 app = Flask(__name__, instance_relative_config=True)
+if ORJSON_AVAILABLE:
+    app.json = OrjsonJSONProvider(app)
 app.config.from_mapping(
     SECRET_KEY=os.environ.get('FLASK_SECRET_KEY', 'dev_change_this_in_prod_!@#$%^&*()'),
     SESSION_TYPE='filesystem',
@@ -69,6 +130,14 @@ app.config.from_mapping(
     SESSION_COOKIE_SAMESITE='Lax',
     MAX_CONTENT_LENGTH = MAX_UPLOAD_MB * 1024 * 1024,
 )
+# A filesystem session is a file read and rewritten on every request; Redis keeps that in memory
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    if REDIS_AVAILABLE:
+        app.config['SESSION_TYPE'] = 'redis'
+        app.config['SESSION_REDIS'] = redis.Redis.from_url(REDIS_URL)
+    else:
+        logging.warning("REDIS_URL is set but the redis package is not installed; using filesystem sessions.")
 try:
     os.makedirs(app.instance_path, exist_ok=True)
     os.makedirs(app.config['SESSION_FILE_DIR'], exist_ok=True)
@@ -91,64 +160,443 @@ if app.debug:
 app.logger.info("Flask application starting...")
 
 # --- Agent Initialization ---
-# Instantiate ALL agents, including DatabaseAgent and NLAnswerAgent
+# Instantiate the data agents, including DatabaseAgent, up front
 try:
     file_loader = FileLoadingAgent()
     preprocessor = PreprocessingAgent()
-    reporter = ReportingAgent()
     database_agent = DatabaseAgent() # Instantiate DatabaseAgent
     text_analyzer = TextAnalysisAgent()
     cleaner = CleaningAgent()
     feature_engineer = FeatureEngineeringAgent()
-    nl_to_sql = NLtoSQLAgent() # Use NLtoSQLAgent
-    nl_answer_generator = NLAnswerAgent() # Instantiate new agent
-    nl_to_viz = NLtoVizAgent()
-    insight_generator = InsightAgent()
-    plotter = PlottingAgent()
     app.logger.info("Agents initialized successfully.")
 except Exception as agent_init_error:
      app.logger.critical(f"CRITICAL: Agent initialization failed: {agent_init_error}", exc_info=True)
      exit(1)
 
+# --- Lazy Agents ---
+# Agents only some routes use are created on first use, so their imports (openai, matplotlib,
+# seaborn/scipy) don't slow down startup or enlarge every worker. One instance per process.
+@lru_cache(maxsize=1)
+def get_nl_to_sql():
+    from agents.llm.nl_to_sql_agent import NLtoSQLAgent
+    return NLtoSQLAgent()
+
+@lru_cache(maxsize=1)
+def get_nl_answer_generator():
+    from agents.llm.nl_answer_agent import NLAnswerAgent
+    return NLAnswerAgent()
+
+@lru_cache(maxsize=1)
+def get_nl_to_viz():
+    from agents.llm.nl_to_viz_agent import NLtoVizAgent
+    return NLtoVizAgent()
+
+@lru_cache(maxsize=1)
+def get_insight_generator():
+    from agents.llm.insight_agent import InsightAgent
+    return InsightAgent()
+
+@lru_cache(maxsize=1)
+def get_plotter():
+    from agents.plotting_agent import PlottingAgent
+    return PlottingAgent()
+
+@lru_cache(maxsize=1)
+def get_reporter():
+    from agents.reporting_agent import ReportingAgent
+    return ReportingAgent()
+
+# --- Plot Rendering ---
+# Plots render in worker processes: pyplot keeps global state that concurrent request threads
+# would share, and rendering there doesn't hold this process's GIL. PLOT_WORKERS=0 renders in-process.
+# Workers are started from a forkserver, not forked from this threaded process (see worker_processes).
+PLOT_WORKERS = int(os.environ.get('PLOT_WORKERS', 2))
+PLOT_TIMEOUT_SECONDS = int(os.environ.get('PLOT_TIMEOUT_SECONDS', 120))
+
+@lru_cache(maxsize=1)
+def get_plot_executor() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=PLOT_WORKERS, mp_context=get_worker_context())
+
+def reset_plot_executor():
+    # Abandons the current pool: queued plots are cancelled and its workers terminated, as one
+    # may be stuck in a plot (other plots in flight fail over to in-process rendering). A new
+    # pool is started on the next plot
+    executor = get_plot_executor()
+    get_plot_executor.cache_clear()
+    workers = list((executor._processes or {}).values()) # No public API for the pool's workers
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in workers:
+        if process.is_alive():
+            process.terminate()
+
+def render_plot(plot_params: dict, df: pd.DataFrame) -> tuple:
+    """Returns (png_bytes, error_message) for the plot, from the worker pool if it is enabled."""
+    if PLOT_WORKERS > 0 and get_worker_context() is not None:
+        from agents.plotting_agent import render_plot_in_worker
+        try:
+            return get_plot_executor().submit(render_plot_in_worker, plot_params, df).result(timeout=PLOT_TIMEOUT_SECONDS)
+        except FuturesTimeoutError:
+            app.logger.error(f"Plot rendering did not finish within {PLOT_TIMEOUT_SECONDS}s; restarting the plot worker pool.")
+            reset_plot_executor()
+            return None, f"Plot rendering timed out after {PLOT_TIMEOUT_SECONDS} seconds."
+        except (BrokenProcessPool, pickle.PicklingError) as e:
+            app.logger.warning(f"Plot worker pool failed ({e}); rendering in-process.")
+            if isinstance(e, BrokenProcessPool):
+                reset_plot_executor()
+    _fig, png_bytes, plot_error = get_plotter().generate_plot(plot_params, df)
+    return png_bytes, plot_error
+
+# --- Background NER Jobs ---
+# NER on large columns can take minutes, so it runs off the request thread and the client
+# polls for the result. Threads (not processes) share the loaded spaCy model, and
+# analyze_entities fans out to its own worker processes where that pays off.
+# Job state lives in a file in the session dir, not in this process, so with several web
+# workers (sharing TEMP_DATA_DIR) a status poll can be answered by any of them. Only the
+# running jobs of this process are held in memory, so they can be cancelled.
+NER_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix='ner_job')
+# A job still 'running' after this long is reported as failed (e.g. its worker was restarted)
+NER_JOB_TIMEOUT_SECONDS = int(os.environ.get('NER_JOB_TIMEOUT_SECONDS', 3600))
+NER_JOB_ID_RE = re.compile(r'[0-9a-f]{32}')
+ner_jobs = {} # job_id -> (session_id, Future, cancel Event), running jobs of this process
+ner_jobs_lock = threading.Lock()
+
+def get_ner_job_path(session_id: str, job_id: str) -> Path:
+    return get_session_data_dir(session_id) / f"ner_job_{job_id}.pkl"
+
+def write_ner_job_state(filepath: Path, state: dict):
+    # Written to a temp name first so a status poll never reads a half-written file
+    tmp_path = filepath.with_name(filepath.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, filepath)
+
+def read_ner_job_state(filepath: Path) -> Optional[dict]:
+    # The job's state as written by write_ner_job_state, None if there is no such job
+    try:
+        with open(filepath, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+
+def run_ner_job(session_id: str, job_id: str, working_table: pa.Table, columns_to_analyze: list,
+                cancel_event: threading.Event):
+    """Converts the working data's NER columns to pandas, runs NER and stores the job's outcome; executed on NER_EXECUTOR."""
+    job_path = get_ner_job_path(session_id, job_id)
+    try:
+        working_df = arrow_table_to_df(working_table, columns_to_analyze)
+        ner_report = text_analyzer.analyze_entities(working_df, columns_to_analyze, cancel_event=cancel_event)
+        if ner_report is None:
+            state = {"status": "error", "error": "NER analysis could not be performed."}
+        else:
+            state = {"status": "done", "ner_report": ner_report}
+    except Exception as e:
+        app.logger.error(f"NER job {job_id} error session {session_id}: {e}", exc_info=True)
+        state = {"status": "error", "error": f"NER analysis failed: {e}"}
+    finally:
+        with ner_jobs_lock:
+            ner_jobs.pop(job_id, None)
+    # A superseded job (its file removed by the newer request) leaves nothing behind
+    if cancel_event.is_set() or not job_path.exists():
+        app.logger.info(f"NER job {job_id} session {session_id} was superseded; result discarded")
+        return
+    try:
+        write_ner_job_state(job_path, state)
+    except Exception as e:
+        app.logger.error(f"Could not store NER job {job_id} result session {session_id}: {e}", exc_info=True)
+
+# --- Profile Cache ---
+# Profiling (describe, correlations, DBSCAN) is the slow part of upload/refresh; when the same
+# data is profiled again, e.g. the same file uploaded again, the earlier report is reused.
+# Hashing every row is only worth it when a cached report could match, so lookups first
+# compare a cheap shape signature (row count, columns and dtypes), and new reports are
+# fingerprinted behind the request. Reports are deep-copied in and out, so callers never
+# share (and can't alter) the cached objects.
+PROFILE_CACHE_SIZE = 16
+profile_cache = OrderedDict() # (shape signature, dbscan params, data fingerprint) -> profile report
+profile_cache_lock = threading.Lock()
+PROFILE_CACHE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix='profile_cache')
+
+def dataframe_signature(df: pd.DataFrame) -> tuple:
+    """Cheap shape signature of a DataFrame: row count, column names and dtypes."""
+    return (len(df), tuple((str(col), str(dtype)) for col, dtype in df.dtypes.items()))
+
+def dataframe_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a DataFrame: column names, dtypes and every row's values."""
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+    hasher.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return hasher.hexdigest()
+
+def store_profile_in_cache(df: pd.DataFrame, signature: tuple, params_key: str, profile_report: dict):
+    # Runs on PROFILE_CACHE_EXECUTOR; df is only read, like everywhere else after loading
+    try:
+        cache_key = (signature, params_key, dataframe_fingerprint(df))
+    except Exception as e:
+        app.logger.debug(f"Could not fingerprint DataFrame for profile cache, not caching: {e}")
+        return
+    with profile_cache_lock:
+        profile_cache[cache_key] = profile_report
+        profile_cache.move_to_end(cache_key)
+        while len(profile_cache) > PROFILE_CACHE_SIZE:
+            profile_cache.popitem(last=False)
+
+def profile_with_cache(df: pd.DataFrame, dbscan_params: dict) -> Optional[dict]:
+    """Runs preprocessor.profile, serving a copy of the cached report when this exact data was profiled before."""
+    try:
+        signature = dataframe_signature(df)
+        params_key = json.dumps(dbscan_params, sort_keys=True)
+    except Exception as e:
+        app.logger.debug(f"Could not build profile cache key, profiling uncached: {e}")
+        return preprocessor.profile(df, dbscan_params)
+    with profile_cache_lock:
+        same_shape_cached = any(key[:2] == (signature, params_key) for key in profile_cache)
+    if same_shape_cached:
+        try:
+            cache_key = (signature, params_key, dataframe_fingerprint(df))
+        except Exception as e:
+            app.logger.debug(f"Could not fingerprint DataFrame for profile cache, profiling uncached: {e}")
+            return preprocessor.profile(df, dbscan_params)
+        with profile_cache_lock:
+            cached_report = profile_cache.get(cache_key)
+            if cached_report is not None:
+                profile_cache.move_to_end(cache_key)
+        if cached_report is not None:
+            app.logger.info("Data unchanged since it was last profiled; reusing cached profile report.")
+            return copy.deepcopy(cached_report)
+    profile_report = preprocessor.profile(df, dbscan_params)
+    if profile_report is not None:
+        PROFILE_CACHE_EXECUTOR.submit(store_profile_in_cache, df, signature, params_key, copy.deepcopy(profile_report))
+    return profile_report
+
+# --- Working Data Cache ---
+# The working DataFrame is reloaded on nearly every request, so the last saved version per
+# session is kept in memory as an (immutable) Arrow table; the Arrow file on disk is written
+# behind the request and only read after eviction, a restart, or a save by another worker.
+# Entries are keyed on the session's '<df_type>_df_version', which changes on every save, and
+# the same version is stored in the Arrow file's schema metadata so a stale file is detected too.
+WORKING_DATA_CACHE_SIZE = 8
+WORKING_DATA_VERSION_KEY = b'working_df_version'
+WORKING_DATA_WAIT_SECONDS = float(os.environ.get('WORKING_DATA_WAIT_SECONDS', 10)) # For another worker's pending write
+working_data_cache = OrderedDict() # (session_id, df_type) -> (version, pa.Table)
+working_data_cache_lock = threading.RLock()
+failed_working_writes = {} # (session_id, df_type) -> version whose background write failed
+DF_WRITE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix='df_writer') # One writer keeps saves in order
+# Loading an upload into PostgreSQL mostly waits on the server, so it overlaps with profiling
+DB_LOAD_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix='db_load')
+
 # --- Helper Functions ---
-# Keep get_session_data_dir, save_df, load_df (for working df parquet),
+# Keep get_session_data_dir, save_df, load_df (for working df Arrow file),
 # get_simple_schema_dict, clean_session_data
 
+ALLOWED_UPLOAD_EXTENSIONS = frozenset(ext.lower() for ext in ALLOWED_FILE_EXTENSIONS)
+
+def get_file_extension(filename: str) -> str:
+    # Lower-cased extension without the dot ('' if there is none)
+    dot = filename.rfind('.')
+    return filename[dot + 1:].lower() if dot >= 0 else ''
+
 def get_session_data_dir(session_id: str) -> Path:
     path = TEMP_DATA_DIR / session_id
     path.mkdir(parents=True, exist_ok=True)
     return path
 
-def save_df(session_id: str, df_type: str, df: pd.DataFrame):
-    # Saves DF to parquet in session-specific dir
-    filepath = get_session_data_dir(session_id) / f"{df_type}_df.parquet"
+def write_arrow_file(table: pa.Table, filepath: Path, on_failure=None) -> bool:
+    # Writes to a temp name first so a reader never maps a half-written file; runs on DF_WRITE_EXECUTOR.
+    # on_failure is called if the write fails, so the caller can stop pointing at the file.
+    tmp_path = filepath.with_name(filepath.name + '.tmp')
+    try:
+        with pa.OSFile(str(tmp_path), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, filepath)
+        app.logger.debug(f"Flushed Arrow file {filepath} ({table.num_rows} rows)")
+        return True
+    except Exception as e:
+        app.logger.error(f"Failed to write Arrow file {filepath}: {e}", exc_info=True)
+        tmp_path.unlink(missing_ok=True)
+        if on_failure is not None:
+            on_failure()
+        return False
+
+def mark_working_write_failed(session_id: str, df_type: str, version: str):
+    # Runs on DF_WRITE_EXECUTOR when a working data write fails: the in-memory table is dropped
+    # and the version recorded, so the next load reports the lost save instead of serving it
+    # from this process only (other workers see the version mismatch in the file on disk)
+    with working_data_cache_lock:
+        cached = working_data_cache.get((session_id, df_type))
+        if cached is not None and cached[0] == version:
+            del working_data_cache[(session_id, df_type)]
+        failed_working_writes[(session_id, df_type)] = version
+
+def save_df(session_id: str, df_type: str, df: pd.DataFrame) -> Optional[pa.Table]:
+    # Keeps DF as an Arrow table in the working data cache and writes the uncompressed Arrow IPC
+    # file in session-specific dir behind the request (only read back after eviction/restart).
+    # Returns the saved table so callers can reuse the conversion, or None if the save failed.
+    filepath = get_session_data_dir(session_id) / f"{df_type}_df.arrow"
     try:
-        df.to_parquet(filepath, index=False, engine='pyarrow')
+        version = uuid.uuid4().hex
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), WORKING_DATA_VERSION_KEY: version.encode()})
+        with working_data_cache_lock:
+            failed_working_writes.pop((session_id, df_type), None)
+            working_data_cache[(session_id, df_type)] = (version, table)
+            working_data_cache.move_to_end((session_id, df_type))
+            while len(working_data_cache) > WORKING_DATA_CACHE_SIZE:
+                working_data_cache.popitem(last=False)
+        DF_WRITE_EXECUTOR.submit(write_arrow_file, table, filepath,
+                                 lambda: mark_working_write_failed(session_id, df_type, version))
         session[f'{df_type}_df_path'] = str(filepath) # Store path string
-        app.logger.debug(f"Saved '{df_type}' DF (parquet) session {session_id} to {filepath}")
+        session[f'{df_type}_schema_dict'] = get_simple_schema_dict(df) # Lets viz skip loading the data
+        session[f'{df_type}_df_version'] = version # Keys the working data cache and files derived from this data (Excel export)
+        app.logger.debug(f"Saved '{df_type}' DF (Arrow) session {session_id}, writing to {filepath}")
+        return table
     except Exception as e:
-        app.logger.error(f"Failed to save '{df_type}' parquet session {session_id} to {filepath}: {e}", exc_info=True)
+        app.logger.error(f"Failed to save '{df_type}' DF session {session_id} to {filepath}: {e}", exc_info=True)
         session.pop(f'{df_type}_df_path', None) # Remove path if save failed
+        session.pop(f'{df_type}_schema_dict', None)
+        session.pop(f'{df_type}_df_version', None)
+        return None
 
-def load_df(session_id: str, df_type: str) -> Optional[pd.DataFrame]:
-    # Loads the WORKING df from parquet
+def read_arrow_table(filepath) -> pa.Table:
+    # Memory-maps the Arrow file, so only the columns that are converted later are actually read
+    with pa.memory_map(str(filepath), 'r') as source:
+        return pa.ipc.open_file(source).read_all()
+
+def arrow_table_to_df(table: pa.Table, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    # Converts the requested columns only; names missing from the table are skipped so callers
+    # can still report them, and if none exist all columns are converted
+    if columns is not None:
+        columns = [col for col in dict.fromkeys(columns) if col in table.column_names]
+        if columns:
+            table = table.select(columns)
+    return table.to_pandas(split_blocks=True)
+
+def arrow_file_version(table: pa.Table) -> Optional[str]:
+    # The working data version save_df stored in the Arrow file, None for files without one
+    version = (table.schema.metadata or {}).get(WORKING_DATA_VERSION_KEY)
+    return version.decode() if version is not None else None
+
+def get_working_table(session_id: str, df_type: str) -> Optional[pa.Table]:
+    # Returns the session's Arrow table from the working data cache, else from its Arrow file
     filepath_str = session.get(f'{df_type}_df_path');
     if not filepath_str:
         app.logger.warning(f"No path found for '{df_type}' DF session {session_id}")
         return None
+    version = session.get(f'{df_type}_df_version')
+    cache_key = (session_id, df_type)
+    with working_data_cache_lock:
+        cached = working_data_cache.get(cache_key)
+        if cached is not None and version is not None and cached[0] == version:
+            working_data_cache.move_to_end(cache_key)
+            return cached[1]
+    # Evicted or saved by another worker: wait for this process's queued writes (the writer runs them in order)
+    DF_WRITE_EXECUTOR.submit(lambda: None).result()
+    with working_data_cache_lock:
+        failed_version = failed_working_writes.get(cache_key)
+    if version is not None and failed_version == version:
+        app.logger.error(f"'{df_type}' DF session {session_id} was not saved (background write failed); discarding it")
+        session.pop(f'{df_type}_df_path', None)
+        return None
     filepath = Path(filepath_str)
-    if filepath.exists() and filepath.is_file():
-        try:
-            df = pd.read_parquet(filepath, engine='pyarrow')
-            app.logger.debug(f"Loaded '{df_type}' DF (parquet) session {session_id} from {filepath} ({len(df)} rows)")
-            return df
-        except Exception as e:
-            app.logger.error(f"Failed to load '{df_type}' parquet session {session_id} from {filepath}: {e}", exc_info=True)
+    deadline = time.monotonic() + WORKING_DATA_WAIT_SECONDS
+    while True:
+        table = None
+        if filepath.is_file():
+            try:
+                table = read_arrow_table(filepath)
+            except Exception as e:
+                app.logger.error(f"Failed to load '{df_type}' Arrow file session {session_id} from {filepath}: {e}", exc_info=True)
+                return None
+        # A missing or older file can be another worker's save still being written behind its request
+        if table is not None and (version is None or arrow_file_version(table) == version):
+            break
+        if time.monotonic() >= deadline:
+            if table is None:
+                app.logger.warning(f"Arrow file not found for '{df_type}' DF session {session_id} at {filepath}")
+            else:
+                app.logger.error(f"Arrow file for '{df_type}' DF session {session_id} at {filepath} is not the "
+                                 f"latest save (version {arrow_file_version(table)}, expected {version}); "
+                                 f"the background write was lost")
+            session.pop(f'{df_type}_df_path', None)
             return None
-    else:
-        app.logger.warning(f"Parquet file not found for '{df_type}' DF session {session_id} at {filepath}")
-        session.pop(f'{df_type}_df_path', None)
+        time.sleep(0.1)
+    app.logger.debug(f"Loaded '{df_type}' DF (Arrow IPC) session {session_id} from {filepath} ({table.num_rows} rows)")
+    with working_data_cache_lock:
+        working_data_cache[cache_key] = (arrow_file_version(table), table)
+        working_data_cache.move_to_end(cache_key)
+        while len(working_data_cache) > WORKING_DATA_CACHE_SIZE:
+            working_data_cache.popitem(last=False)
+    return table
+
+def save_query_result(session_id: str, results_df: pd.DataFrame):
+    # Writes the last successful query result to an Arrow file (behind the request, like save_df)
+    # and keeps only its path in the session
+    filepath = get_session_data_dir(session_id) / "last_query_result.arrow"
+    try:
+        table = pa.Table.from_pandas(results_df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+        # e.g. object columns mixing types; the CSV download then re-executes the query
+        app.logger.debug(f"Query result not Arrow-convertible session {session_id}, not stored: {e}")
+        session.pop('last_query_result_path', None)
+        return
+    DF_WRITE_EXECUTOR.submit(write_arrow_file, table, filepath)
+    session['last_query_result_path'] = str(filepath)
+
+def load_query_result(session_id: str) -> Optional[pd.DataFrame]:
+    # Reads back the result stored by save_query_result, None if there is none
+    filepath_str = session.get('last_query_result_path')
+    if not filepath_str:
         return None
+    DF_WRITE_EXECUTOR.submit(lambda: None).result() # The writer runs queued writes in order
+    try:
+        return read_arrow_table(filepath_str).to_pandas(split_blocks=True)
+    except Exception as e:
+        app.logger.warning(f"Could not read stored query result session {session_id} from {filepath_str}: {e}")
+        return None
+
+def save_session_report(session_id: str, report_key: str, report) -> None:
+    # Large reports (profile, NER) are pickled to the session dir and only their path is kept in
+    # the session, so they aren't re-serialized with the session on every request
+    filepath = get_session_data_dir(session_id) / f"{report_key}.pkl"
+    tmp_path = filepath.with_name(filepath.name + '.tmp')
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(report, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, filepath)
+        session[f'{report_key}_path'] = str(filepath)
+    except Exception as e:
+        app.logger.error(f"Failed to save '{report_key}' session {session_id}: {e}", exc_info=True)
+        tmp_path.unlink(missing_ok=True)
+        session.pop(f'{report_key}_path', None)
+
+def load_session_report(report_key: str):
+    # Reads back a report stored by save_session_report, None if there is none
+    filepath_str = session.get(f'{report_key}_path')
+    if not filepath_str:
+        return None
+    try:
+        with open(filepath_str, 'rb') as f:
+            return pickle.load(f)
+    except Exception as e:
+        app.logger.warning(f"Could not read '{report_key}' from {filepath_str}: {e}")
+        return None
+
+def load_df(session_id: str, df_type: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+    # Loads the WORKING df, optionally just the given columns
+    table = get_working_table(session_id, df_type)
+    if table is None:
+        return None
+    try:
+        return arrow_table_to_df(table, columns)
+    except Exception as e:
+        app.logger.error(f"Failed to convert '{df_type}' DF session {session_id} to pandas: {e}", exc_info=True)
+        return None
+
+def drop_cached_working_data(session_id: str):
+    with working_data_cache_lock:
+        for cache_key in [key for key in working_data_cache if key[0] == session_id]:
+            del working_data_cache[cache_key]
+        for cache_key in [key for key in failed_working_writes if key[0] == session_id]:
+            del failed_working_writes[cache_key]
 
 # Keep get_simple_schema_dict for viz validation
 def get_simple_schema_dict(df: pd.DataFrame) -> Dict:
@@ -156,32 +604,72 @@ def get_simple_schema_dict(df: pd.DataFrame) -> Dict:
      return {"columns": {col: str(dtype) for col, dtype in df.dtypes.items()}}
 
 def clean_session_data(session_id: str):
-    # Clean parquet files
+    # Clean cached working data and working data files. Queued background writes are waited
+    # for first, so none of them recreates a file after it was removed
+    DF_WRITE_EXECUTOR.submit(lambda: None).result() # The writer runs queued writes in order
+    drop_cached_working_data(session_id)
     data_dir = get_session_data_dir(session_id)
     if data_dir.exists():
         deleted_count = 0
         try:
-            for item in data_dir.iterdir():
-                if item.is_file() and item.name.endswith(('.parquet', '.tmp', '.upload')): # Clean parquet and potential temp uploads
-                    os.remove(item)
-                    deleted_count += 1
+            # scandir's DirEntry caches the file type, so no extra stat() per entry
+            with os.scandir(data_dir) as entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False) and entry.name.endswith(('.arrow', '.parquet', '.pkl', '.xlsx', '.tmp', '.upload', '.png')): # Clean data files, reports, exports, plots and potential temp uploads
+                        try:
+                            os.unlink(entry.path)
+                            deleted_count += 1
+                        except FileNotFoundError:
+                            pass # Already removed (e.g. by a concurrent request)
             if deleted_count > 0:
                 app.logger.info(f"Removed {deleted_count} temp file(s) for session {session_id}")
         except Exception as e:
             app.logger.error(f"Error cleaning session data {session_id}: {e}", exc_info=True)
     # Note: Doesn't automatically clean PG tables, handled by DROP IF EXISTS on upload.
 
+@lru_cache(maxsize=64)
+def _cached_schema_str(pg_table_name_full: str, schema_version: str) -> str:
+    # Lookup errors are raised, so lru_cache only keeps successful schema strings.
+    # schema_version only keys the cache (see get_schema_str)
+    # Handle potential quoting if Identifier added them (unlikely for simple names)
+    schema_parts = pg_table_name_full.replace('"', '').split('.')
+    db_schema_name = schema_parts[0] if len(schema_parts) > 1 else DB_DEFAULT_SCHEMA_NAME
+    db_table_name = schema_parts[-1]
+    app.logger.debug(f"Extracted Schema: '{db_schema_name}', Table: '{db_table_name}' for schema lookup.")
+    schema_str = database_agent.get_table_schema_for_llm(db_table_name, db_schema_name)
+    if schema_str.startswith("Error:"):
+        raise LookupError(schema_str)
+    return schema_str
+
+def get_schema_str(pg_table_name_full: str) -> str:
+    """Schema description of a PG table for LLM prompts ("Error: ..." if it can't be read).
+
+    Cached per process, keyed on the table's catalog fingerprint: recreating or altering the
+    table (from any worker or client) changes the key, so no worker serves an old schema."""
+    schema_version = database_agent.get_table_schema_version(pg_table_name_full)
+    try:
+        if schema_version is None: # Not found or unreadable: look it up uncached
+            return _cached_schema_str.__wrapped__(pg_table_name_full, '')
+        return _cached_schema_str(pg_table_name_full, schema_version)
+    except LookupError as e:
+        return str(e)
+
+# Session keys potentially invalidated by data modifications
+DOWNSTREAM_SESSION_KEYS = (
+    'profile_report_path', 'ner_report_path', 'cleaning_suggestions',
+    'feature_suggestions', 'llm_summary', 'generated_plots_metadata',
+    'last_nl_query', 'last_query_result_path', 'last_nl_answer',
+    'last_query_error', 'last_generated_sql', 'profile_table_version'
+    # Keep pg_table_name, pg_schema_for_llm, dataframe_name, llm_config
+)
+# Session keys tied to the uploaded data; a new upload starts from none of them
+UPLOAD_SESSION_KEYS = ('pg_table_name', 'pg_schema_for_llm', 'dataframe_name', 'original_df_path', 'working_df_path',
+                       'working_schema_dict', 'working_df_version') + DOWNSTREAM_SESSION_KEYS
+
 def clear_downstream_session_state(reason: str):
     """Clears session keys potentially invalidated by data modifications."""
-    keys_to_clear = [
-        'profile_report', 'ner_report', 'cleaning_suggestions',
-        'feature_suggestions', 'llm_summary', 'generated_plots_metadata',
-        'last_nl_query', 'last_query_result_raw', 'last_nl_answer',
-        'last_query_error', 'last_generated_sql'
-        # Keep pg_table_name, pg_schema_for_llm, dataframe_name, llm_config
-    ]
     cleared = []
-    for key in keys_to_clear:
+    for key in DOWNSTREAM_SESSION_KEYS:
         if session.pop(key, None) is not None:
             cleared.append(key)
     if cleared:
@@ -207,11 +695,18 @@ def get_session_state_endpoint():
         "dataframe_name": session.get("dataframe_name"),
         "llm_config": session.get("llm_config"),
         "llm_configured": session.get("llm_configured", False),
-        "profile_report": session.get("profile_report"),
+        "profile_report": load_session_report('profile_report'),
         "working_df_available": pg_table_exists, # Base availability on PG table now
         "pg_table_name": session.get("pg_table_name") # Return table name if exists
     })
 
+def discard_failed_upload(session_id: str):
+    # Removes what a failed upload left behind: its files (after pending writes finish, see
+    # clean_session_data) and every session key describing its data
+    clean_session_data(session_id)
+    for key in ('original_df_path', 'working_df_path', 'working_schema_dict', 'working_df_version', 'pg_table_name'):
+        session.pop(key, None)
+
 @app.route('/api/upload', methods=['POST'])
 def upload_file_endpoint():
     session_id = session.get('session_id', str(uuid.uuid4()))
@@ -223,50 +718,50 @@ def upload_file_endpoint():
     filename = secure_filename(file.filename)
     if not file or not filename:
         return jsonify({"error": "No selected file or invalid filename"}), 400
-    if '.' not in filename or filename.rsplit('.', 1)[1].lower() not in ALLOWED_FILE_EXTENSIONS:
+    if get_file_extension(filename) not in ALLOWED_UPLOAD_EXTENSIONS:
         return jsonify({"error": f"Invalid file type. Allowed: {', '.join(ALLOWED_FILE_EXTENSIONS)}"}), 400
     try:
         # Clear previous session state associated with old data
-        keys_to_clear = ['pg_table_name', 'pg_schema_for_llm', 'dataframe_name', 'profile_report', 'ner_report', 'cleaning_suggestions', 'feature_suggestions', 'llm_summary', 'generated_plots_metadata', 'last_nl_query', 'last_query_result_raw', 'last_nl_answer', 'last_query_error', 'last_generated_sql', 'original_df_path', 'working_df_path']
-        for key in keys_to_clear:
-            session.pop(key, None)
+        for key in UPLOAD_SESSION_KEYS & session.keys(): # Only keys actually set
+            del session[key]
         clean_session_data(session_id) # Clean old temp files
 
-        # Load DataFrame using FileLoadingAgent
-        temp_upload_dir = get_session_data_dir(session_id)
-        temp_upload_path = temp_upload_dir / f"upload_{uuid.uuid4().hex}_{filename}"
-        file.save(temp_upload_path)
-        df = file_loader.load_data(temp_upload_path);
-        try:
-            os.remove(temp_upload_path)
-        except OSError:
-            pass # Ignore if file already gone
+        # Load DataFrame using FileLoadingAgent, straight from the upload's stream: Werkzeug
+        # already spools large uploads to a temp file, so saving another copy first is not needed
+        df = file_loader.load_data(file.stream, file_name=filename);
 
         if df is None:
             return jsonify({"error": "Failed to load data from file"}), 400
         session['dataframe_name'] = filename # Store original filename
 
         # --- Create table in PostgreSQL and load data ---
+        # Runs on DB_LOAD_EXECUTOR while this thread saves and profiles df; all of them only read it
         base_table_name = filename.rsplit('.', 1)[0] if '.' in filename else filename
-        pg_table_name, pg_schema_for_llm = database_agent.create_table_from_df(df, base_table_name)
+        pg_load_future = DB_LOAD_EXECUTOR.submit(database_agent.create_table_from_df, df, base_table_name)
+
+        # --- Keep working DF as Arrow as well, for agents that might need it ---
+        # This allows cleaning/FE to operate on pandas DF easily before reloading to PG.
+        # The Arrow conversion only reads df (profiling below uses it too), so no copy is needed.
+        save_df(session_id, 'working', df)
+
+        # Run profiling on the initial DataFrame
+        profile_report = profile_with_cache(df, {'eps': DEFAULT_DBSCAN_EPS, 'min_samples': DEFAULT_DBSCAN_MIN_SAMPLES})
 
+        pg_table_name, pg_schema_for_llm = pg_load_future.result()
         if not pg_table_name or not pg_schema_for_llm:
             app.logger.error(f"Failed to create/load table in PostgreSQL for session {session_id}")
+            discard_failed_upload(session_id)
             return jsonify({"error": "Failed to prepare data in the database."}), 500
 
         session['pg_table_name'] = pg_table_name
         session['pg_schema_for_llm'] = pg_schema_for_llm
         app.logger.info(f"DataFrame loaded into PostgreSQL table: {pg_table_name} for session {session_id}")
 
-        # --- Save working DF to parquet as well, for agents that might need it ---
-        # This allows cleaning/FE to operate on pandas DF easily before reloading to PG
-        save_df(session_id, 'working', df.copy())
-
-        # Run profiling on the initial DataFrame
-        profile_report = preprocessor.profile(df, {'eps': DEFAULT_DBSCAN_EPS, 'min_samples': DEFAULT_DBSCAN_MIN_SAMPLES})
         if profile_report is None:
             app.logger.error(f"Data profiling failed for session {session_id}")
-        session['profile_report'] = profile_report
+        else:
+            session['profile_table_version'] = database_agent.get_table_version(pg_table_name)
+        save_session_report(session_id, 'profile_report', profile_report)
 
         app.logger.info(f"File '{filename}' uploaded and processed for session {session_id}.")
         return jsonify({
@@ -276,10 +771,7 @@ def upload_file_endpoint():
 
     except Exception as e:
         app.logger.error(f"Upload failed for session {session_id}: {e}", exc_info=True)
-        clean_session_data(session_id)
-        session.pop('original_df_path', None)
-        session.pop('working_df_path', None)
-        session.pop('pg_table_name', None) # Clean up state
+        discard_failed_upload(session_id)
         return jsonify({"error": f"An internal error occurred during upload: {str(e)}"}), 500
 
 @app.route('/api/config_llm', methods=['POST'])
@@ -317,23 +809,16 @@ def generate_query_endpoint():
     if not nl_query:
         return jsonify({"error": "No query provided."}), 400
 
-    # *** Extract schema and table name parts ***
-    # Handle potential quoting if Identifier added them (unlikely for simple names)
-    schema_parts = pg_table_name_full.replace('"', '').split('.')
-    db_schema_name = schema_parts[0] if len(schema_parts) > 1 else DB_DEFAULT_SCHEMA_NAME
-    db_table_name = schema_parts[-1]
-    app.logger.debug(f"Extracted Schema: '{db_schema_name}', Table: '{db_table_name}' for schema lookup.")
-
-    # *** Call the CORRECT DatabaseAgent method to get the schema string ***
-    schema_str = database_agent.get_table_schema_for_llm(db_table_name, db_schema_name)
+    # *** Get the schema string (cached per table, see get_schema_str) ***
+    schema_str = get_schema_str(pg_table_name_full)
     if schema_str.startswith("Error:"):
-        app.logger.error(f"Failed to get schema string for {db_schema_name}.{db_table_name}: {schema_str}")
+        app.logger.error(f"Failed to get schema string for {pg_table_name_full}: {schema_str}")
         return jsonify({"error": f"Database schema not found or failed to load ({schema_str})."}), 404
 
     app.logger.debug(f"Schema string being passed to NLtoSQLAgent:\n{schema_str}") # Log the schema string
 
     # Call NLtoSQLAgent with the formatted schema string
-    sql_query, error = nl_to_sql.generate_sql_query(nl_query, schema_str, session['llm_config'])
+    sql_query, error = get_nl_to_sql().generate_sql_query(nl_query, schema_str, session['llm_config'])
 
     if error:
         app.logger.error(f"SQL generation failed session {session_id}: {error}")
@@ -344,7 +829,7 @@ def generate_query_endpoint():
     # Store query info in session
     session['last_nl_query'] = nl_query
     session['last_generated_sql'] = sql_query
-    session.pop('last_query_result_raw', None)
+    session.pop('last_query_result_path', None)
     session.pop('last_nl_answer', None)
     session.pop('last_query_error', None)
 
@@ -366,13 +851,15 @@ def execute_query_endpoint():
     app.logger.info(f"Attempting to execute SQL for session {session_id}: {sql_query_to_execute[:200]}...")
     original_nl_query = session.get('last_nl_query', "the user's question") # Needed for NL answer
 
-    max_retries = nl_to_sql.MAX_RETRIES # Get from agent
+    max_retries = get_nl_to_sql().MAX_RETRIES # Get from agent
     attempt = 0
     results_df = None
     db_error_feedback = None
     llm_config = session.get('llm_config')
     if not llm_config:
         return jsonify({"error": "LLM config not found in session."}), 400 # Needed for retry
+    pg_table_name_full = session.get('pg_table_name') # For the retry prompt's schema
+    schema_str = None # Looked up on the first failure only, then reused by later retries
 
     while attempt <= max_retries:
         results_df, db_error = database_agent.execute_query(sql_query_to_execute)
@@ -382,16 +869,13 @@ def execute_query_endpoint():
             app.logger.error(f"SQL exec attempt {attempt+1} failed session {session_id}. Error: {db_error_feedback}")
             if attempt < max_retries:
                 app.logger.info(f"Attempting LLM retry ({attempt+1}/{max_retries}) to fix SQL.")
-                # Get schema string again for retry prompt
-                pg_table_name_full = session.get('pg_table_name')
+                # Get schema string for retry prompt
                 if not pg_table_name_full: return jsonify({"error": "Table name not found for retry."}), 500
-                schema_parts = pg_table_name_full.replace('"', '').split('.')
-                db_schema_name = schema_parts[0] if len(schema_parts) > 1 else DB_DEFAULT_SCHEMA_NAME
-                db_table_name = schema_parts[-1]
-                schema_str = database_agent.get_table_schema_for_llm(db_table_name, db_schema_name)
+                if schema_str is None:
+                    schema_str = get_schema_str(pg_table_name_full)
                 if schema_str.startswith("Error:"): return jsonify({"error": f"Schema not found for retry ({schema_str})."}), 500
 
-                corrected_sql, gen_error = nl_to_sql.generate_sql_query(
+                corrected_sql, gen_error = get_nl_to_sql().generate_sql_query(
                     nl_question=original_nl_query, schema_str=schema_str, llm_config=llm_config,
                     previous_query=sql_query_to_execute, db_error=db_error_feedback
                 )
@@ -410,7 +894,9 @@ def execute_query_endpoint():
         else:
             # SQL Success
             session.pop('last_query_error', None)
-            session['last_query_result_raw'] = results_df # Store for NL Answer Agent
+            if not sql_query_to_execute.lstrip().lower().startswith(('select', 'with')):
+                session.pop('profile_table_version', None) # So the next profile refresh re-reads it
+            save_query_result(session_id, results_df) # For the CSV download, without pickling it into the session
             app.logger.info(f"SQL query executed successfully session {session_id}.")
             break # Exit retry loop
 
@@ -419,13 +905,22 @@ def execute_query_endpoint():
     nl_gen_error = None
     llm_skipped_due_to_size = False
 
+    # Tiny result (single value or one short row): answered without an LLM round-trip. Only done
+    # where the LLM would have answered, so sessions without one still get no NL answer
+    template_answer = None
     if results_df is not None and session.get('llm_configured'):
+        template_answer = get_nl_answer_generator().template_answer(results_df)
+    if template_answer is not None:
+        nl_answer = template_answer
+        session['last_nl_answer'] = nl_answer
+        app.logger.info(f"NL answer templated for session {session_id}: {nl_answer[:100]}")
+    elif results_df is not None and session.get('llm_configured'):
         app.logger.info(f"Generating NL answer for session {session_id}...")
         original_nl_query = session.get('last_nl_query', "the user's question")
         llm_config = session.get('llm_config')
 
         # Call the updated NLAnswerAgent method
-        answer_text, error_msg, llm_was_called = nl_answer_generator.generate_nl_answer(
+        answer_text, error_msg, llm_was_called = get_nl_answer_generator().generate_nl_answer(
             original_question=original_nl_query,
             data_results=results_df,
             llm_config=llm_config,
@@ -459,13 +954,12 @@ def execute_query_endpoint():
     raw_data_snippet = None
     raw_data_type = "NotApplicable"
     if results_df is not None:
-        # session['last_query_result_raw'] = results_df # Already stored above
         max_rows_to_send = 50
         row_count = len(results_df)
         try:
              # Prepare snippet for frontend display
              if isinstance(results_df, pd.DataFrame):
-                 raw_data_snippet = results_df.head(max_rows_to_send).to_dict(orient="records")
+                 raw_data_snippet = dataframe_head_records(results_df, max_rows_to_send)
                  raw_data_type = f"DataFrame (showing first {min(row_count, max_rows_to_send)} of {row_count} rows)"
              elif isinstance(results_df, pd.Series):
                   raw_data_snippet = results_df.head(max_rows_to_send).reset_index().to_dict(orient="records")
@@ -496,24 +990,65 @@ def execute_query_endpoint():
 # --- Cleaning & FE Endpoints (Updated to reload PG table) ---
 
 MAX_PREVIEW_ROWS = 50 # Define how many rows for the preview
+QUERY_CSV_CHUNK_ROWS = 50000 # Rows encoded per streamed chunk of the query result CSV
+EXCEL_EXPORT_MAX_ROWS = 1_000_000 # Larger data is pointed to CSV (a sheet holds at most 1,048,576 rows)
+EXCEL_WRITE_CHUNK_ROWS = 10000 # Rows converted to Python objects at a time for the Excel writer
+UNSAFE_FILENAME_CHARS_RE = re.compile(r'[^\w.]') # \w is alphanumerics (as str.isalnum) plus '_'
+EXPORT_STREAM_CHUNK_BYTES = 256 * 1024 # Read size when streaming a finished export file
+EXCEL_EXPORT_ENGINE = os.environ.get('EXCEL_EXPORT_ENGINE', 'xlsxwriter').lower() # 'openpyxl' skips xlsxwriter
+
+def dataframe_head_records(df: pd.DataFrame, max_rows: int) -> list:
+    # First max_rows rows as a list of {column: value} dicts, built by Arrow's column-wise
+    # to_pylist (missing values become None, i.e. JSON null) instead of pandas' per-cell boxing
+    head_df = df.head(max_rows)
+    try:
+        return pa.Table.from_pandas(head_df, preserve_index=False).to_pylist()
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+        app.logger.debug(f"Result snippet not Arrow-convertible, using pandas to_dict: {e}")
+        return head_df.to_dict(orient="records")
+
+def preview_json_default(value):
+    # Values orjson/json can't encode natively (dates for stdlib json, Decimal, timedelta...)
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+def dataframe_preview_json(df: pd.DataFrame, arrow_table: Optional[pa.Table] = None) -> str:
+    # Serializes the first MAX_PREVIEW_ROWS rows as a {"columns": [...], "data": [[...], ...]} string
+    # (the shape DataFramePreview parses) from Arrow columns, not pandas' per-cell JSON encoder.
+    # If the frame was already converted to Arrow (save_df), only that table's first rows are read.
+    try:
+        if arrow_table is not None:
+            preview_table = arrow_table.slice(0, MAX_PREVIEW_ROWS) # Zero-copy view
+        else:
+            preview_table = pa.Table.from_pandas(df.head(MAX_PREVIEW_ROWS), preserve_index=False)
+        preview = {
+            "columns": preview_table.column_names,
+            "data": [list(row) for row in zip(*(column.to_pylist() for column in preview_table.columns))]
+        }
+        if ORJSON_AVAILABLE:
+            return orjson.dumps(preview, default=preview_json_default).decode()
+        return json.dumps(preview, default=preview_json_default, allow_nan=False)
+    except Exception as e:
+        # Mixed-type object columns and similar can't go through Arrow; use pandas' encoder
+        app.logger.debug(f"Arrow preview serialization failed, falling back to pandas to_json: {e}")
+        return df.head(MAX_PREVIEW_ROWS).to_json(orient="split", date_format="iso", default_handler=str)
 
 @app.route('/api/apply_cleaning', methods=['POST'])
 def apply_cleaning_endpoint():
     session_id = session.get('session_id');
     if not session_id:
         return jsonify({"error": "Session not found"}), 400
-    working_df = load_df(session_id, 'working') # Load from parquet
-    if working_df is None:
-        return jsonify({"error": "Working data (parquet) not found."}), 404
     data = request.json
     actions = data.get('actions') if isinstance(data, dict) else None
     if not isinstance(actions, list):
         return jsonify({"error": "Invalid 'actions' list."}), 400
-    if not actions:
+    if not actions: # Nothing to apply, so the working data isn't loaded
         return jsonify({"message": "No actions provided.", "logs": [], "data_preview": None}), 200 # Added data_preview
+    working_df = load_df(session_id, 'working') # Load working data file
+    if working_df is None:
+        return jsonify({"error": "Working data file not found."}), 404
     try:
         modified_df, logs = cleaner.apply_cleaning_steps(working_df, actions)
-        save_df(session_id, 'working', modified_df) # Save modified parquet
+        working_table = save_df(session_id, 'working', modified_df) # Save modified data file
 
         base_table_name = session.get('dataframe_name', 'cleaned_data').rsplit('.', 1)[0]
         new_pg_table, new_pg_schema = database_agent.create_table_from_df(modified_df, base_table_name)
@@ -525,9 +1060,8 @@ def apply_cleaning_endpoint():
         clear_downstream_session_state("cleaning")
         app.logger.info(f"Applied cleaning session {session_id}. DB table '{new_pg_table}' updated.")
 
-        preview_df = modified_df.head(MAX_PREVIEW_ROWS)
-        # Using orient='split' is good for reconstructing DataFrame in JS
-        data_preview_json = preview_df.to_json(orient="split", date_format="iso", default_handler=str)
+        # The 'split'-style columns/data layout is good for reconstructing DataFrame in JS
+        data_preview_json = dataframe_preview_json(modified_df, working_table)
 
         return jsonify({
             "message": "Cleaning actions applied and data updated.",
@@ -543,18 +1077,18 @@ def apply_features_endpoint():
     session_id = session.get('session_id');
     if not session_id:
         return jsonify({"error": "Session not found"}), 400
-    working_df = load_df(session_id, 'working') # Load from parquet
-    if working_df is None:
-        return jsonify({"error": "Working data (parquet) not found."}), 404
     data = request.json
     features_to_create = data.get('features') if isinstance(data, dict) else None
     if not isinstance(features_to_create, list):
         return jsonify({"error": "Invalid 'features' list."}), 400
-    if not features_to_create:
+    if not features_to_create: # Nothing to apply, so the working data isn't loaded
         return jsonify({"message": "No features provided.", "logs": [], "data_preview": None}), 200 # Added data_preview
+    working_df = load_df(session_id, 'working') # Load working data file
+    if working_df is None:
+        return jsonify({"error": "Working data file not found."}), 404
     try:
         modified_df, logs = feature_engineer.apply_features(working_df, features_to_create)
-        save_df(session_id, 'working', modified_df) # Save modified parquet
+        working_table = save_df(session_id, 'working', modified_df) # Save modified data file
 
         base_table_name = session.get('dataframe_name', 'engineered_data').rsplit('.', 1)[0]
         new_pg_table, new_pg_schema = database_agent.create_table_from_df(modified_df, base_table_name)
@@ -566,8 +1100,7 @@ def apply_features_endpoint():
         clear_downstream_session_state("feature engineering")
         app.logger.info(f"Applied features session {session_id}. DB table '{new_pg_table}' updated.")
 
-        preview_df = modified_df.head(MAX_PREVIEW_ROWS)
-        data_preview_json = preview_df.to_json(orient="split", date_format="iso", default_handler=str)
+        data_preview_json = dataframe_preview_json(modified_df, working_table)
 
         return jsonify({
             "message": "Features created successfully.",
@@ -578,49 +1111,129 @@ def apply_features_endpoint():
         app.logger.error(f"Apply features error session {session_id}: {e}", exc_info=True)
         return jsonify({"error": f"Failed to create features: {e}"}), 500
 
+def generate_file_chunks_and_delete(export_path: Path):
+    # Streams an export file written to the session dir, then removes it. send_file's file
+    # wrapper would skip close callbacks, so the file is streamed here.
+    try:
+        with open(export_path, 'rb') as export_file:
+            while chunk := export_file.read(EXPORT_STREAM_CHUNK_BYTES):
+                yield chunk
+    finally:
+        export_path.unlink(missing_ok=True)
+
+def iter_excel_rows(df: pd.DataFrame):
+    # Yields data rows as tuples, converting EXCEL_WRITE_CHUNK_ROWS rows to Python objects at a
+    # time; missing values become None (empty cells) and infinities the text 'inf'/'-inf', as
+    # pandas' to_excel writes them (xlsxwriter rejects non-finite numbers)
+    float_columns = [i for i, dtype in enumerate(df.dtypes) if pd.api.types.is_float_dtype(dtype)]
+    for start in range(0, len(df), EXCEL_WRITE_CHUNK_ROWS):
+        chunk = df.iloc[start:start + EXCEL_WRITE_CHUNK_ROWS]
+        object_chunk = chunk.astype(object).where(chunk.notna(), None)
+        for i in float_columns:
+            values = chunk.iloc[:, i].to_numpy(dtype=float, na_value=np.nan)
+            infinite = np.isinf(values)
+            if infinite.any():
+                object_chunk.iloc[infinite, i] = np.where(values[infinite] > 0, 'inf', '-inf')
+        yield from object_chunk.itertuples(index=False, name=None)
+
+def write_excel_constant_memory(df: pd.DataFrame, output, sheet_name: str = 'Sheet1'):
+    """Writes df to an xlsx file object with xlsxwriter's constant_memory mode."""
+    # That mode flushes each row once the next one starts, so rows are written here strictly
+    # in order; pandas' to_excel emits cells column by column, which would lose data.
+    workbook_options = {
+        'constant_memory': True,
+        'strings_to_urls': False, # Plain text, as openpyxl writes it
+        'strings_to_formulas': False, # Cell text starting with '=' stays text
+        'nan_inf_to_errors': True, # Backstop for infinities in object columns (float columns are written as text)
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+    }
+    with xlsxwriter.Workbook(output, workbook_options) as workbook:
+        worksheet = workbook.add_worksheet(sheet_name)
+        header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'}) # pandas' header style
+        worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+        for row_number, row in enumerate(iter_excel_rows(df), start=1):
+            worksheet.write_row(row_number, 0, row)
+
+def write_excel_write_only(df: pd.DataFrame, output, sheet_name: str = 'Sheet1'):
+    """Writes df to an xlsx file with openpyxl's write-only workbook (fallback when xlsxwriter is missing)."""
+    # Write-only mode streams appended rows to disk instead of keeping a Cell object per value
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(sheet_name)
+    thin = Side(style='thin')
+    header_cells = []
+    for col in df.columns: # pandas' header style
+        cell = WriteOnlyCell(worksheet, value=str(col))
+        cell.font = Font(bold=True)
+        cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+        cell.alignment = Alignment(horizontal='center', vertical='top')
+        header_cells.append(cell)
+    worksheet.append(header_cells)
+    for row in iter_excel_rows(df):
+        worksheet.append(row)
+    workbook.save(output)
+
 @app.route('/api/download_data/excel', methods=['GET'])
 def download_data_excel_endpoint():
     session_id = session.get('session_id')
     if not session_id:
         return jsonify({"error": "Session not found"}), 400
 
-    working_df = load_df(session_id, 'working')
-    if working_df is None:
-        return jsonify({"error": "No working data found to download."}), 404
-
     dataframe_name = session.get('dataframe_name', 'exported_data')
-    # Basic filename sanitization and ensure .xlsx extension
-    excel_filename = "".join(c if c.isalnum() or c in ['_', '.'] else '_' for c in dataframe_name)
-    if not excel_filename.lower().endswith(('.xlsx', '.xls')):
-        excel_filename += ".xlsx"
-    excel_filename = f"{excel_filename.split('.')[0]}_modified.xlsx"
-
-
-    try:
-        output = BytesIO()
-        # Use openpyxl engine for .xlsx format
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            working_df.to_excel(writer, index=False, sheet_name='Sheet1')
-        output.seek(0)
+    # Basic filename sanitization: the stem (up to the first '.') plus _modified.xlsx
+    excel_filename = f"{UNSAFE_FILENAME_CHARS_RE.sub('_', dataframe_name).split('.')[0]}_modified.xlsx"
 
+    # The workbook is written once per version of the working data (save_df sets a new
+    # working_df_version on every save) and kept in the session dir, so repeated downloads of
+    # unchanged data are served from disk, and with an ETag the browser can get a 304
+    data_dir = get_session_data_dir(session_id)
+    working_version = session.get('working_df_version') or uuid.uuid4().hex
+    export_path = data_dir / f"export_{working_version}.xlsx"
+    if not export_path.is_file():
+        working_df = load_df(session_id, 'working')
+        if working_df is None:
+            return jsonify({"error": "No working data found to download."}), 404
+        if len(working_df) > EXCEL_EXPORT_MAX_ROWS:
+            return jsonify({"error": f"Data has {len(working_df):,} rows, too many for an Excel download "
+                                     f"(limit {EXCEL_EXPORT_MAX_ROWS:,}). Please export it as CSV instead."}), 413
+
+        # Written under a temp name, so a concurrent download never serves a partial file
+        tmp_path = data_dir / f"export_{working_version}.{uuid.uuid4().hex}.xlsx.tmp"
+        try:
+            written = False
+            if XLSXWRITER_AVAILABLE and EXCEL_EXPORT_ENGINE == 'xlsxwriter':
+                try:
+                    write_excel_constant_memory(working_df, str(tmp_path))
+                    written = True
+                except Exception as e:
+                    app.logger.warning(f"xlsxwriter export failed for session {session_id}, retrying with openpyxl: {e}")
+            if not written:
+                write_excel_write_only(working_df, str(tmp_path))
+            del working_df # Only the file is needed from here on
+            os.replace(tmp_path, export_path)
+        except Exception as e:
+            app.logger.error(f"Error generating Excel file for session {session_id}: {e}", exc_info=True)
+            tmp_path.unlink(missing_ok=True)
+            return jsonify({"error": f"Failed to generate Excel file: {str(e)}"}), 500
+        for stale_export in data_dir.glob('export_*.xlsx'): # Workbooks of earlier versions
+            if stale_export != export_path:
+                stale_export.unlink(missing_ok=True)
         app.logger.info(f"Prepared Excel download for session {session_id}, filename: {excel_filename}")
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=excel_filename
-        )
-    except Exception as e:
-        app.logger.error(f"Error generating Excel file for session {session_id}: {e}", exc_info=True)
-        return jsonify({"error": f"Failed to generate Excel file: {str(e)}"}), 500
+    else:
+        app.logger.info(f"Serving cached Excel download for session {session_id}, filename: {excel_filename}")
+
+    return send_file(export_path.resolve(), mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                     as_attachment=True, download_name=excel_filename, conditional=True, etag=True, max_age=0)
 
 @app.route('/api/suggest_cleaning', methods=['GET'])
 def suggest_cleaning_endpoint():
     session_id = session.get('session_id');
     if not session_id:
         return jsonify({"error": "Session not found"}), 400
-    profile_report = session.get('profile_report')
-    working_df = load_df(session_id, 'working') # Use parquet working_df
+    profile_report = load_session_report('profile_report')
+    working_df = load_df(session_id, 'working') # Use working_df file
     if working_df is None or profile_report is None:
         return jsonify({"error": "Data or profile not available."}), 404
     try:
@@ -636,7 +1249,7 @@ def suggest_features_endpoint():
     session_id = session.get('session_id');
     if not session_id:
         return jsonify({"error": "Session not found"}), 400
-    working_df = load_df(session_id, 'working') # Use parquet working_df
+    working_df = load_df(session_id, 'working') # Use working_df file
     if working_df is None:
         return jsonify({"error": "Working data not found."}), 404
     try:
@@ -652,8 +1265,8 @@ def ner_analyze_endpoint():
     session_id = session.get('session_id');
     if not session_id:
         return jsonify({"error": "Session not found"}), 400
-    working_df = load_df(session_id, 'working') # Use parquet working_df
-    if working_df is None:
+    working_table = get_working_table(session_id, 'working')
+    if working_table is None:
         return jsonify({"error": "Working data not found."}), 404
     data = request.json
     columns_to_analyze = data.get('columns') if isinstance(data, dict) else None
@@ -662,12 +1275,54 @@ def ner_analyze_endpoint():
     try:
         if not text_analyzer or not hasattr(text_analyzer, 'nlp') or not text_analyzer.nlp:
             return jsonify({"error": "Text Analysis agent/model unavailable."}), 503
-        ner_report = text_analyzer.analyze_entities(working_df, columns_to_analyze)
-        if ner_report is None:
-            return jsonify({"error": "NER analysis could not be performed."}), 500
-        session['ner_report'] = ner_report
+        job_id = uuid.uuid4().hex
+        # A new request supersedes any earlier NER job of this session: queued jobs are
+        # cancelled, running ones stop at their next check, and jobs on other workers
+        # find their state file gone and discard their result
+        with ner_jobs_lock:
+            for old_job_id, (job_session_id, old_future, old_cancel_event) in list(ner_jobs.items()):
+                if job_session_id == session_id:
+                    old_cancel_event.set()
+                    old_future.cancel()
+                    del ner_jobs[old_job_id]
+        for old_job_path in get_session_data_dir(session_id).glob('ner_job_*.pkl'):
+            old_job_path.unlink(missing_ok=True)
+        write_ner_job_state(get_ner_job_path(session_id, job_id), {"status": "running"})
+        cancel_event = threading.Event()
+        with ner_jobs_lock:
+            # The worker gets the immutable Arrow table, not the session or a DataFrame
+            ner_jobs[job_id] = (session_id, NER_EXECUTOR.submit(run_ner_job, session_id, job_id, working_table,
+                                                                columns_to_analyze, cancel_event), cancel_event)
+        app.logger.info(f"NER analysis job {job_id} queued session {session_id}")
+        return jsonify({"job_id": job_id, "status": "running"}), 202
+    except Exception as e:
+        app.logger.error(f"NER analysis error session {session_id}: {e}", exc_info=True)
+        return jsonify({"error": f"NER analysis failed: {e}"}), 500
+
+@app.route('/api/ner_analyze/status/<job_id>', methods=['GET'])
+def ner_analyze_status_endpoint(job_id):
+    session_id = session.get('session_id');
+    if not session_id:
+        return jsonify({"error": "Session not found"}), 400
+    if not NER_JOB_ID_RE.fullmatch(job_id):
+        return jsonify({"error": "NER job not found."}), 404
+    job_path = get_ner_job_path(session_id, job_id) # Per session dir, so other sessions' jobs are not found
+    try:
+        state = read_ner_job_state(job_path)
+        if state is None:
+            return jsonify({"error": "NER job not found."}), 404
+        if state["status"] == "running":
+            if time.time() - job_path.stat().st_mtime < NER_JOB_TIMEOUT_SECONDS:
+                return jsonify({"job_id": job_id, "status": "running"}), 202
+            app.logger.error(f"NER job {job_id} session {session_id} did not finish within {NER_JOB_TIMEOUT_SECONDS}s")
+            state = {"status": "error", "error": "NER analysis did not finish."}
+        job_path.unlink(missing_ok=True) # The outcome is reported once
+        if state["status"] != "done":
+            return jsonify({"error": state["error"]}), 500
+        ner_report = state["ner_report"]
+        save_session_report(session_id, 'ner_report', ner_report) # Stored when the client collects the result
         app.logger.info(f"NER analysis completed session {session_id}")
-        return jsonify(ner_report), 200
+        return jsonify({"job_id": job_id, "status": "done", "ner_report": ner_report}), 200
     except Exception as e:
         app.logger.error(f"NER analysis error session {session_id}: {e}", exc_info=True)
         return jsonify({"error": f"NER analysis failed: {e}"}), 500
@@ -679,13 +1334,13 @@ def generate_summary_endpoint():
         return jsonify({"error": "Session not found"}), 400
     if not session.get('llm_configured'):
         return jsonify({"error": "LLM not configured"}), 400
-    profile_report = session.get('profile_report')
+    profile_report = load_session_report('profile_report')
     if profile_report is None:
         return jsonify({"error": "Profile report not available."}), 404
     try:
-        summary = insight_generator.generate_summary(
+        summary = get_insight_generator().generate_summary(
             profile_report=profile_report, llm_config=session['llm_config'],
-            ner_report=session.get('ner_report'), dataframe_name=session.get('dataframe_name')
+            ner_report=load_session_report('ner_report'), dataframe_name=session.get('dataframe_name')
         )
         if summary and not summary.startswith("Error:"):
             session['llm_summary'] = summary
@@ -707,18 +1362,21 @@ def generate_viz_params_endpoint():
         return jsonify({"error": "Session not found"}), 400
     if not session.get('llm_configured'):
         return jsonify({"error": "LLM not configured"}), 400
-    working_df = load_df(session_id, 'working') # Use parquet working_df
-    if working_df is None:
-        return jsonify({"error": "Working data not found."}), 404
+    # Column dtypes are recorded by save_df; the data itself is only loaded if they are missing
+    schema_dict = session.get('working_schema_dict') if session.get('working_df_path') else None
+    if schema_dict is None:
+        working_df = load_df(session_id, 'working') # Use working_df file
+        if working_df is None:
+            return jsonify({"error": "Working data not found."}), 404
+        schema_dict = get_simple_schema_dict(working_df)
     data = request.json
     nl_request = data.get('request') if isinstance(data, dict) else None
     if not nl_request:
         return jsonify({"error": "No visualization request provided."}), 400
     try:
-        schema_dict = get_simple_schema_dict(working_df)
         schema_str = "\n".join([f"- {col}: {dtype}" for col, dtype in schema_dict.get('columns', {}).items()])
         app.logger.debug(f"Schema string for Viz Agent:\n{schema_str}")
-        params, error = nl_to_viz.generate_viz_params(nl_request, schema_str, session['llm_config'], schema_dict)
+        params, error = get_nl_to_viz().generate_viz_params(nl_request, schema_str, session['llm_config'], schema_dict)
         if error:
             app.logger.error(f"Viz params generation failed session {session_id}: {error}")
             return jsonify({"error": f"Viz params generation failed: {error}"}), 500
@@ -735,36 +1393,50 @@ def generate_plot_endpoint():
     session_id = session.get('session_id');
     if not session_id:
         return jsonify({"error": "Session not found"}), 400
-    working_df = load_df(session_id, 'working') # Load parquet for plotting
-    if working_df is None:
-        return jsonify({"error": "Working data not found."}), 404
     data = request.json
     plot_params = data.get('params') if isinstance(data, dict) else None
     if not isinstance(plot_params, dict):
         return jsonify({"error": "Invalid plot parameters."}), 400
+    # Only the columns the plot references are read from the working data file
+    plot_columns = [plot_params.get(key) for key in ('x_col', 'y_col', 'color_col', 'size_col')]
+    plot_columns = [col for col in plot_columns if isinstance(col, str)] or None
+    working_df = load_df(session_id, 'working', columns=plot_columns) # Load working data for plotting
+    if working_df is None:
+        return jsonify({"error": "Working data not found."}), 404
     try:
-        if not plotter or not hasattr(plotter, 'generate_plot'):
-            return jsonify({"error": "Plotting agent unavailable."}), 503
-        fig, png_bytes, plot_error = plotter.generate_plot(plot_params, working_df)
+        png_bytes, plot_error = render_plot(plot_params, working_df)
         if plot_error:
             app.logger.error(f"Plotting error session {session_id}: {plot_error}")
             return jsonify({"error": f"Plotting failed: {plot_error}"}), 500
-        if not fig or not png_bytes:
+        if not png_bytes:
             return jsonify({"error": "Plot did not return image data."}), 500
-        png_base64 = base64.b64encode(png_bytes).decode('utf-8')
-        plot_data_url = f"data:image/png;base64,{png_base64}"
-        app.logger.info(f"Generated plot image session {session_id}")
-        return jsonify({"plot_data_url": plot_data_url, "filename": DEFAULT_PLOT_FILENAME}), 200
+        # The PNG is served as-is from /api/plot/<plot_id> rather than inlined as a base64 data URL
+        plot_id = uuid.uuid4().hex
+        (get_session_data_dir(session_id) / f"plot_{plot_id}.png").write_bytes(png_bytes)
+        app.logger.info(f"Generated plot image {plot_id} session {session_id}")
+        return jsonify({"plot_id": plot_id, "plot_url": f"/api/plot/{plot_id}", "filename": DEFAULT_PLOT_FILENAME}), 200
     except Exception as e:
         app.logger.error(f"Generate plot error session {session_id}: {e}", exc_info=True)
         return jsonify({"error": f"Failed plot: {e}"}), 500
 
+@app.route('/api/plot/<plot_id>', methods=['GET'])
+def get_plot_endpoint(plot_id):
+    session_id = session.get('session_id');
+    if not session_id:
+        return jsonify({"error": "Session not found"}), 400
+    if not plot_id.isalnum(): # Plot ids are uuid hex; rejects path tricks
+        return jsonify({"error": "Plot not found."}), 404
+    plot_path = get_session_data_dir(session_id) / f"plot_{plot_id}.png"
+    if not plot_path.is_file():
+        return jsonify({"error": "Plot not found."}), 404
+    return send_file(plot_path.resolve(), mimetype='image/png', as_attachment=True, download_name=DEFAULT_PLOT_FILENAME)
+
 @app.route('/api/download/profile_pdf', methods=['GET'])
 def download_profile_pdf():
      session_id = session.get('session_id');
      if not session_id:
          return jsonify({"error": "Session not found"}), 400
-     profile_report = session.get('profile_report')
+     profile_report = load_session_report('profile_report')
      dataframe_name = session.get('dataframe_name', 'data')
 
      # Add this logging
@@ -774,7 +1446,7 @@ def download_profile_pdf():
          app.logger.error(f"Profile report not found in session for PDF download. Session ID: {session_id}") # More specific log
          return jsonify({"error": "Profile report not found."}), 404
      try:
-         pdf_bytes = reporter.generate_report_pdf(profile_report, dataframe_name)
+         pdf_bytes = get_reporter().generate_report_pdf(profile_report, dataframe_name)
          if not pdf_bytes:
              return jsonify({"error": "Failed PDF generation."}), 500
          filename = f"{secure_filename(dataframe_name)}_profile_report.pdf"
@@ -793,9 +1465,8 @@ def download_query_result_csv():
     if not session_id:
         return jsonify({"error": "Session not found"}), 400
 
-    # Load the RAW result dataframe stored after the last SUCCESSFUL execution
-    # Note: This assumes 'last_query_result_raw' holds the full DF, which is risky for memory.
-    # A better approach is still re-executing 'last_generated_sql'.
+    # Load the RAW result dataframe stored (as an Arrow file) after the last SUCCESSFUL execution;
+    # if it's not available, 'last_generated_sql' is re-executed.
     sql_to_run = session.get('last_generated_sql')
     last_error = session.get('last_query_error')
 
@@ -804,20 +1475,75 @@ def download_query_result_csv():
     if not sql_to_run:
         return jsonify({"error": "No successful query found to download results for."}), 404
 
-    app.logger.info(f"Preparing CSV download session {session_id} by re-executing: {sql_to_run[:100]}...")
-    results_df, error = database_agent.execute_query(sql_to_run) # Re-execute query
+    filename = DEFAULT_QUERY_RESULTS_FILENAME
+    results_df, error = load_query_result(session_id), None
+    if results_df is not None:
+        app.logger.info(f"Preparing CSV download session {session_id} from the stored query result")
+    else:
+        # PostgreSQL writes the CSV itself (COPY ... TO STDOUT) into a session-dir file that is
+        # streamed back, so the result never becomes a DataFrame; statements COPY can't wrap
+        # are re-executed through pandas below
+        app.logger.info(f"Preparing CSV download session {session_id} by re-executing: {sql_to_run[:100]}...")
+        export_path = get_session_data_dir(session_id) / f"query_export_{uuid.uuid4().hex}.csv.tmp"
+        try:
+            with open(export_path, 'wb') as export_file:
+                copy_error = database_agent.copy_query_to_csv(sql_to_run, export_file)
+        except OSError as e:
+            copy_error = str(e)
+        if copy_error is None:
+            app.logger.info(f"Serving query result CSV session {session_id} from PostgreSQL COPY: {filename}")
+            return FlaskResponse(
+                generate_file_chunks_and_delete(export_path),
+                mimetype='text/csv',
+                headers={'Content-Disposition': f'attachment; filename="{filename}"',
+                         'Content-Length': str(export_path.stat().st_size)}
+            )
+        export_path.unlink(missing_ok=True)
+        results_df, error = database_agent.execute_query(sql_to_run) # Re-execute query
     if error or results_df is None:
         app.logger.error(f"CSV download: SQL re-exec failed session {session_id}. Error: {error}")
         return jsonify({"error": f"Failed data retrieval. Error: {error}"}), 500
     try:
+        # The same CSV pandas' to_csv writes (index column for DataFrames, booleans as True/False);
+        # only the rarer COPY path above writes PostgreSQL's own format
         is_df = isinstance(results_df, pd.DataFrame)
-        csv_data = results_df.to_csv(index=is_df).encode('utf-8')
-        filename = DEFAULT_QUERY_RESULTS_FILENAME
+        try:
+            # Arrow's C++ CSV writer formats whole columns at once instead of row by row in Python
+            result_table = pa.Table.from_pandas(results_df if is_df else results_df.to_frame(), preserve_index=False)
+            for i, field in enumerate(result_table.schema):
+                if pa.types.is_boolean(field.type): # Arrow would write true/false
+                    result_table = result_table.set_column(i, field.name, pc.if_else(result_table.column(i), 'True', 'False'))
+            if is_df:
+                result_table = result_table.add_column(0, '', pa.array(results_df.index)) # Index column, as to_csv writes it
+            pacsv.write_csv(result_table.slice(0, 0), io.BytesIO()) # Raises here for types the CSV writer lacks (e.g. structs)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as arrow_err:
+            # e.g. object columns mixing types; pandas can still stringify those
+            app.logger.debug(f"Query result not Arrow-convertible, using pandas CSV writer: {arrow_err}")
+            result_table = None
+
+        def generate_csv_chunks():
+            # Encode the CSV a slice at a time so the full text never sits in memory
+            if result_table is not None:
+                sink = io.BytesIO()
+                with pacsv.CSVWriter(sink, result_table.schema) as writer: # Writes the header row
+                    for batch in result_table.to_batches(max_chunksize=QUERY_CSV_CHUNK_ROWS):
+                        writer.write_batch(batch)
+                        yield sink.getvalue()
+                        sink.seek(0)
+                        sink.truncate()
+                yield sink.getvalue() # Header only, if there were no rows
+                return
+            yield results_df.iloc[:0].to_csv(index=is_df).encode('utf-8') # Header row
+            for start in range(0, len(results_df), QUERY_CSV_CHUNK_ROWS):
+                chunk = results_df.iloc[start:start + QUERY_CSV_CHUNK_ROWS]
+                yield chunk.to_csv(index=is_df, header=False).encode('utf-8')
+
         app.logger.info(f"Serving query result CSV session {session_id}: {filename}")
-        response = make_response(csv_data)
-        response.headers['Content-Type'] = 'text/csv'
-        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
+        return FlaskResponse(
+            stream_with_context(generate_csv_chunks()),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
     except Exception as e:
         app.logger.error(f"Download CSV error session {session_id}: {e}", exc_info=True)
         return jsonify({"error": f"Failed CSV: {e}"}), 500
@@ -835,28 +1561,38 @@ def refresh_profile_report_endpoint():
 
     app.logger.info(f"Refreshing profile report for session {session_id}, table '{pg_table_name}'")
     try:
+        # Unchanged table (same table fingerprint as when it was last profiled): the stored
+        # report is still current, so the table isn't pulled from PostgreSQL and re-profiled
+        table_version = database_agent.get_table_version(pg_table_name)
+        if table_version is not None and table_version == session.get('profile_table_version'):
+            profile_report = load_session_report('profile_report')
+            if profile_report is not None and session.get('working_df_path'):
+                app.logger.info(f"Table '{pg_table_name}' unchanged since last profile, session {session_id}; reusing report.")
+                return jsonify({"profile_report": profile_report, "message": "Profile report is up to date."}), 200
+
         # Load the current state of the data from PostgreSQL
         current_df = database_agent.get_dataframe_from_table(pg_table_name)
         if current_df is None:
             app.logger.error(f"Failed to load DataFrame from table '{pg_table_name}' for reprofiling session {session_id}.")
             return jsonify({"error": f"Could not load data from table '{pg_table_name}' for profiling."}), 500
 
-        # Update the working_df.parquet to reflect the current state of the database.
-        # This is crucial for other agents that might use the parquet file.
-        save_df(session_id, 'working', current_df.copy())
-        app.logger.debug(f"Updated working_df.parquet from database table '{pg_table_name}' during reprofile for session {session_id}")
+        # Update the working_df.arrow to reflect the current state of the database.
+        # This is crucial for other agents that might use the working data file.
+        save_df(session_id, 'working', current_df) # Arrow conversion only reads the frame, no copy needed
+        app.logger.debug(f"Updated working_df.arrow from database table '{pg_table_name}' during reprofile for session {session_id}")
 
         # Generate new profile report
         dbscan_params = {
             'eps': DEFAULT_DBSCAN_EPS,
             'min_samples': DEFAULT_DBSCAN_MIN_SAMPLES
         }
-        profile_report = preprocessor.profile(current_df, dbscan_params)
+        profile_report = profile_with_cache(current_df, dbscan_params)
         if profile_report is None:
             app.logger.error(f"Data re-profiling failed for session {session_id}, table '{pg_table_name}'")
             return jsonify({"error": "Failed to generate new profile report."}), 500
 
-        session['profile_report'] = profile_report
+        save_session_report(session_id, 'profile_report', profile_report)
+        session['profile_table_version'] = table_version # Read before the data, so a concurrent write forces the next refresh
         app.logger.info(f"Profile report refreshed and updated in session {session_id} for table '{pg_table_name}'.")
         return jsonify({"profile_report": profile_report, "message": "Profile report refreshed."}), 200
 
@@ -866,6 +1602,10 @@ def refresh_profile_report_endpoint():
 
 # --- Main Execution ---
 if __name__ == '__main__':
+    # Worker processes would re-import this script as their main module and start a second
+    # copy of the app (agents, DB pool), so `python app.py` does its work in-process;
+    # `flask run` and WSGI servers use worker processes
+    disable_worker_processes("app.py was started as a script")
     host = os.environ.get('FLASK_HOST', '0.0.0.0')
     port = int(os.environ.get('FLASK_PORT', 5000))
     debug = os.environ.get('FLASK_ENV', 'development') == 'development'
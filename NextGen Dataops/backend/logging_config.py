@@ -1,11 +1,42 @@
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 LOG_FILENAME = 'backend_app.log'
 LOG_DIR = os.path.dirname(__file__) # Place log file in the backend directory
 LOG_FILEPATH = os.path.join(LOG_DIR, LOG_FILENAME)
 
+_queue_listener = None # Writes queued records to the real handlers, see setup_logging
+
+
+class CountingRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that counts what it writes instead of checking the file for every record."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._bytes_written = os.path.getsize(self.baseFilename) if os.path.exists(self.baseFilename) else 0
+        self._record_length = 0 # Length of the record being emitted
+
+    def shouldRollover(self, record):
+        if self.maxBytes <= 0:
+            return False
+        # Characters, not encoded bytes: equal for ASCII logs; the real size is checked below
+        self._record_length = len(self.format(record)) + 1
+        self._bytes_written += self._record_length
+        if self._bytes_written < self.maxBytes:
+            return False
+        if super().shouldRollover(record):
+            return True
+        # The file is smaller than counted (e.g. multi-byte text or rotated elsewhere): resync
+        self._bytes_written = self.stream.tell() if self.stream else 0
+        return False
+
+    def doRollover(self):
+        super().doRollover()
+        self._bytes_written = self._record_length # The record that triggered the rollover opens the new file
+
 def setup_logging(log_level_str='INFO'):
     """Configures centralized logging for the application."""
 
@@ -19,7 +50,7 @@ def setup_logging(log_level_str='INFO'):
 
     # --- File Handler ---
     # Rotates logs, keeping 5 backups of 5MB each
-    file_handler = RotatingFileHandler(
+    file_handler = CountingRotatingFileHandler(
         LOG_FILEPATH,
         maxBytes=5*1024*1024, # 5 MB
         backupCount=5,
@@ -43,16 +74,29 @@ def setup_logging(log_level_str='INFO'):
     root_logger.setLevel(logging.DEBUG)
 
     # Remove existing handlers to avoid duplicates if setup is called multiple times
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop() # Flushes records queued for the previous handlers
+    else:
+        atexit.register(_stop_queue_listener)
     if root_logger.hasHandlers():
         root_logger.handlers.clear()
 
-    # Add the handlers to the root logger
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
+    # Logging threads only enqueue records; one listener thread formats and writes them
+    # to the file and console handlers, each filtering on its own level
+    log_queue = queue.Queue(-1)
+    root_logger.addHandler(QueueHandler(log_queue))
+    _queue_listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _queue_listener.start()
 
     # Use the root logger for this initial message, as specific loggers might not exist yet
     root_logger.info(f"Logging configured. Level: {log_level_str}. Output file: {LOG_FILEPATH}")
 
+def _stop_queue_listener():
+    # Registered with atexit: writes out records still in the queue before the process exits
+    if _queue_listener is not None:
+        _queue_listener.stop()
+
 # Example of how to get a logger in other modules:
 # import logging
 # logger = logging.getLogger(__name__) # Using __name__ helps identify the module in logs
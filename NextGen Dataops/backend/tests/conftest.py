@@ -0,0 +1,7 @@
+# backend/tests/conftest.py
+
+import os
+import sys
+
+# The agents are imported as top-level packages from the backend directory, as app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,52 @@
+# backend/tests/test_preprocessing_agent.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agents.preprocessing_agent import PreprocessingAgent
+
+
+@pytest.fixture
+def agent():
+    return PreprocessingAgent()
+
+
+@pytest.mark.parametrize("values", [
+    [1, '1'],
+    [None, 'None'],
+    [1.5, '1.5', 1.5],
+    [True, 'True', 1],
+])
+def test_count_duplicates_mixed_object_values(agent, values):
+    df = pd.DataFrame({'a': pd.Series(values, dtype=object)})
+    assert agent._count_duplicates(df) == int(df.duplicated().sum())
+
+
+@pytest.mark.parametrize("df", [
+    pd.DataFrame({'a': [None, 'None']}),
+    pd.DataFrame({'a': pd.Series([None, np.nan, 'x', 'x'], dtype=object)}),
+    pd.DataFrame({'a': ['x', None, 'x', None], 'b': [1, 2, 1, 2]}),
+    pd.DataFrame({'a': pd.Series([None, pd.NA, np.nan, None, 'NaN'], dtype=object)}),
+])
+def test_count_duplicates_missing_text(agent, df):
+    assert agent._count_duplicates(df) == int(df.duplicated().sum())
+
+
+@pytest.mark.parametrize("df", [
+    pd.DataFrame({'f': [0.0, -0.0, 0.0]}),
+    pd.DataFrame({'f': [0.0, -0.0, np.nan, np.nan], 's': ['a', 'a', 'b', 'b']}),
+    pd.DataFrame({'f': pd.array([0.0, -0.0, None], dtype='Float64')}),
+])
+def test_count_duplicates_signed_zero(agent, df):
+    assert agent._count_duplicates(df) == int(df.duplicated().sum())
+
+
+@pytest.mark.parametrize("df", [
+    pd.DataFrame({'f': [0.0, -0.0, 1.0, np.nan]}),
+    pd.DataFrame({'s': ['a', 'b', 'a', None], 'i': [1, 2, 2, 3]}),
+    pd.DataFrame({'m': pd.Series([1, '1', None, 1], dtype=object)}),
+    pd.DataFrame({'o': pd.Series([0.0, -0.0, None], dtype=object)}),
+])
+def test_cardinality_matches_nunique(agent, df):
+    assert agent._cardinality(df) == df.nunique().astype(int).to_dict()
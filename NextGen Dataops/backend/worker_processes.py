@@ -0,0 +1,41 @@
+# backend/worker_processes.py
+
+import logging
+import multiprocessing
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Plot rendering and NER run in worker processes. The web process is multi-threaded (request
+# threads, the write-behind/NER/DB-load executors, the logging QueueListener), and forking it
+# can copy a lock another thread holds into the child, which then deadlocks. Workers are
+# therefore started from a forkserver, a single-threaded process that imports the worker
+# modules once; spawn is used where forkserver is not available (Windows).
+WORKER_PRELOAD_MODULES = ['agents.plotting_agent', 'agents.text_analysis_agent']
+
+_worker_context = None
+_worker_context_lock = threading.Lock()
+_disabled_reason = None # Set by disable_worker_processes
+
+
+def disable_worker_processes(reason: str):
+    """Makes get_worker_context return None, so callers run their work in-process."""
+    global _disabled_reason
+    _disabled_reason = reason
+    logger.info(f"Worker processes disabled: {reason}")
+
+
+def get_worker_context() -> Optional[multiprocessing.context.BaseContext]:
+    """Returns the multiprocessing context for worker pools, or None if workers are disabled."""
+    global _worker_context
+    if _disabled_reason is not None:
+        return None
+    with _worker_context_lock:
+        if _worker_context is None:
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                _worker_context = multiprocessing.get_context('forkserver')
+                _worker_context.set_forkserver_preload(WORKER_PRELOAD_MODULES)
+            else:
+                _worker_context = multiprocessing.get_context('spawn')
+        return _worker_context
@@ -106,6 +106,9 @@ function NerAnalysisSection({ profileReport, nerReport, setNerReport, setLoading
          if (!data || data.error) {
              return <p className="text-danger small mt-2">Analysis failed for '{columnName}': {data?.error || 'Unknown error'}</p>;
          }
+         if (data.skipped) {
+             return <p className="text-muted small mt-2">Skipped '{columnName}' ({data.skipped}).</p>;
+         }
          const types = data.entities_by_type || {};
          const top = data.top_entities || [];
          const typesArray = Object.entries(types).map(([type, count]) => ({ Type: type, Count: count })).sort((a,b)=>b.Count - a.Count);
@@ -81,7 +81,7 @@ function QueryVizSection({ isLlmConfigured, dataframeName, setLoading, setError
     // --- State for NL Viz ---
     const [vizRequest, setVizRequest] = useState('');
     const [plotParams, setPlotParams] = useState(null); // Store generated params
-    const [plotDataUrl, setPlotDataUrl] = useState(''); // Store base64 data URL
+    const [plotDataUrl, setPlotDataUrl] = useState(''); // Store plot image URL
     const [plotFilename, setPlotFilename] = useState('plot.png'); // Store suggested filename
     const [isGeneratingParams, setIsGeneratingParams] = useState(false);
     const [isGeneratingPlot, setIsGeneratingPlot] = useState(false);
@@ -159,7 +159,7 @@ function QueryVizSection({ isLlmConfigured, dataframeName, setLoading, setError
             setIsGeneratingPlot(true); // Now generating plot
             try {
                 const plotResponse = await apiService.generatePlot(params);
-                setPlotDataUrl(plotResponse.data.plot_data_url);
+                setPlotDataUrl(apiService.getPlotUrl(plotResponse.data.plot_id));
                 setPlotFilename(plotResponse.data.filename || 'plot.png');
             } catch (plotErr) {
                  console.error("Plot Generation Error:", plotErr);
@@ -11,6 +11,10 @@ const API_BASE_URL = process.env.REACT_APP_API_URL || // For Create React App
 
 console.log("Using API Base URL:", API_BASE_URL); // Log for debugging
 
+// How often to poll for the result of a background NER job, and how long to wait for it at most
+const NER_POLL_INTERVAL_MS = 1000;
+const NER_POLL_TIMEOUT_MS = 30 * 60 * 1000;
+
 // Create an Axios instance with default settings
 const apiClient = axios.create({
   baseURL: API_BASE_URL, // All requests will be relative to this
@@ -126,10 +130,27 @@ const apiService = {
 
   /**
    * Analyzes text columns for Named Entities.
+   * The backend runs NER as a background job; this polls until the report is ready
+   * and resolves with a response whose data is the NER report. Rejects if the job
+   * reports an unexpected status or is still running after NER_POLL_TIMEOUT_MS.
    * @param {Array<string>} columns - List of column names to analyze.
    */
-  analyzeNer: (columns) => {
-    return apiClient.post('/ner_analyze', { columns });
+  analyzeNer: async (columns) => {
+    const startResponse = await apiClient.post('/ner_analyze', { columns });
+    const jobId = startResponse.data.job_id;
+    const deadline = Date.now() + NER_POLL_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+      await new Promise(resolve => setTimeout(resolve, NER_POLL_INTERVAL_MS));
+      const statusResponse = await apiClient.get(`/ner_analyze/status/${jobId}`);
+      const status = statusResponse.data.status;
+      if (status === 'done') {
+        return { ...statusResponse, data: statusResponse.data.ner_report };
+      }
+      if (status !== 'running') {
+        throw new Error(`NER analysis returned unexpected status: ${status}`);
+      }
+    }
+    throw new Error('NER analysis timed out.');
   },
 
   /**
@@ -152,7 +173,15 @@ const apiService = {
    * @param {object} params - Plot parameters dictionary.
    */
   generatePlot: (params) => {
-    return apiClient.post('/generate_plot', { params }); // Expects data URL back
+    return apiClient.post('/generate_plot', { params }); // Expects a plot_id back
+  },
+
+  /**
+   * Returns the URL of a generated plot image (served by the backend as PNG).
+   * @param {string} plotId - The plot_id returned by generatePlot.
+   */
+  getPlotUrl: (plotId) => {
+    return `${API_BASE_URL}/plot/${plotId}`;
   },
 
   /**